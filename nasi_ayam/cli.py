@@ -0,0 +1,439 @@
+"""The nasi-ayam command line, imported by the entry point once its loading
+spinner is running and logging is set up."""
+
+import io
+import itertools
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+
+from nasi_ayam.config import Config
+from nasi_ayam.database import (
+    clear_messages,
+    configure_pool,
+    get_cursor,
+    get_document_versions,
+    get_ingestion_log,
+    update_document_stat,
+    update_document_version,
+    upsert_ingestion_log,
+)
+from nasi_ayam.generation.agent import RetrievalAgent
+from nasi_ayam.ingestion.embedder import Embedder
+from nasi_ayam.ingestion.http_cache import HttpCache
+from nasi_ayam.ingestion.loader import (
+    LoadedDocument,
+    PdfConverter,
+    load_github_documents,
+    load_local_documents,
+    materialise_documents,
+)
+from nasi_ayam.ingestion.pipeline import IngestionPipeline
+from nasi_ayam.logging import get_logger
+from nasi_ayam.models import configure_models
+from nasi_ayam.progress import ProgressCallback
+from nasi_ayam.retrieval.memory_index import MemoryVectorIndex
+from nasi_ayam.spinner import Spinner
+from nasi_ayam.vector_store import rebuild_vector_index
+
+logger = get_logger("main")
+
+INGESTION_SKIP_HOURS = 24
+
+
+def _run_migrations(database_url: str) -> None:
+    """Run any pending database migrations."""
+    logger.info("Running database migrations")
+    alembic_cfg = AlembicConfig("alembic.ini")
+    alembic_cfg.set_main_option("sqlalchemy.url", database_url)
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        command.upgrade(alembic_cfg, "head")
+    logger.info("Migrations complete")
+
+
+def _should_skip_ingestion(
+    database_url: str, source_type: str, source_path: str
+) -> bool:
+    """Check if we should skip ingestion for a source."""
+    with get_cursor(database_url) as cur:
+        log = get_ingestion_log(cur, source_type, source_path)
+        if log is None:
+            return False
+
+        last_updated = log["updated_at"]
+        if last_updated.tzinfo is None:
+            last_updated = last_updated.replace(tzinfo=timezone.utc)
+
+        hours_since = (datetime.now(timezone.utc) - last_updated).total_seconds() / 3600
+        return bool(hours_since < INGESTION_SKIP_HOURS)
+
+
+def _document_versions(database_url: str, source: str) -> dict[str, dict[str, Any]]:
+    """Get what is already stored for each document from a source."""
+    with get_cursor(database_url) as cur:
+        return get_document_versions(cur, source)
+
+
+def _changed_documents(
+    database_url: str,
+    stored: dict[str, dict[str, Any]],
+    documents: Iterable[LoadedDocument],
+) -> Iterator[LoadedDocument]:
+    """Drop documents whose content hash matches the stored copy.
+
+    This runs before ``materialise_documents`` so unchanged PDFs are never
+    converted. If an unchanged document's remote version or file stats have
+    not been recorded yet they are stored now, so the next run can skip it
+    without downloading or reading it.
+    """
+    for doc in documents:
+        existing = stored.get(doc.file_path)
+        if existing is None or existing["content_hash"] != doc.content_hash:
+            yield doc
+            continue
+
+        logger.debug(f"Skipping unchanged document: {doc.file_name}")
+        if doc.blob_sha and existing["blob_sha"] != doc.blob_sha:
+            with get_cursor(database_url) as cur:
+                update_document_version(cur, existing["id"], doc.blob_sha)
+        if doc.mtime_ns is not None and doc.inode is not None:
+            if (existing["mtime_ns"], existing["inode"]) != (doc.mtime_ns, doc.inode):
+                with get_cursor(database_url) as cur:
+                    update_document_stat(cur, existing["id"], doc.mtime_ns, doc.inode)
+
+
+def _local_documents(
+    config: Config, completed: list[tuple[str, str]]
+) -> Iterator[LoadedDocument]:
+    """Yield changed documents from the local directory.
+
+    The source is appended to ``completed`` once it has been fully read.
+    """
+    source_type = "local"
+    source_path = config.local_data_path
+
+    try:
+        stored = _document_versions(config.database_url, source_type)
+        known_stats = {
+            path: (row["mtime_ns"], row["file_size"], row["inode"])
+            for path, row in stored.items()
+            if row["mtime_ns"] is not None and row["inode"] is not None
+        }
+        yield from _changed_documents(
+            config.database_url,
+            stored,
+            load_local_documents(
+                source_path,
+                known_stats,
+                include=config.local_include,
+                exclude=config.local_exclude,
+                max_depth=config.local_max_depth,
+                workers=config.local_read_workers,
+            ),
+        )
+    except FileNotFoundError:
+        logger.warning(f"Local data directory not found: {source_path}")
+        return
+
+    completed.append((source_type, source_path))
+
+
+def _github_documents(
+    config: Config, completed: list[tuple[str, str]]
+) -> Iterator[LoadedDocument]:
+    """Yield changed documents from the GitHub directory.
+
+    Files whose blob SHA matches the stored one are skipped by the loader
+    without being downloaded. The source is appended to ``completed`` once it
+    has been fully read.
+    """
+    source_type = "github"
+    source_path = config.github_data_path
+    cache = HttpCache(config.http_cache_path) if config.http_cache_path else None
+
+    try:
+        stored = _document_versions(config.database_url, source_type)
+        known_shas = {path: row["blob_sha"] for path, row in stored.items()}
+        yield from _changed_documents(
+            config.database_url,
+            stored,
+            load_github_documents(
+                source_path, config.github_concurrency, known_shas, cache
+            ),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to ingest from GitHub: {e}")
+        return
+
+    completed.append((source_type, source_path))
+
+
+def _run_ingestion(config: Config) -> None:
+    """Run document ingestion from all sources."""
+    spinner = Spinner("Ingesting", inline=True)
+    spinner.start()
+
+    local_skip = _should_skip_ingestion(
+        config.database_url, "local", config.local_data_path
+    )
+    github_skip = _should_skip_ingestion(
+        config.database_url, "github", config.github_data_path
+    )
+
+    if local_skip and github_skip:
+        spinner.stop("Ingestion up to date")
+        return
+
+    completed: list[tuple[str, str]] = []
+    sources: list[Iterator[LoadedDocument]] = []
+    if not local_skip:
+        sources.append(_local_documents(config, completed))
+    if not github_skip:
+        sources.append(_github_documents(config, completed))
+
+    total = 0
+    embedder = Embedder(config.embedding_backend)
+    try:
+        pipeline = IngestionPipeline(
+            database_url=config.database_url,
+            embedder=embedder,
+            semantic_chunk_size=config.semantic_chunk_size,
+            chunk_size=config.chunk_size,
+            overlap_size=config.overlap_size,
+            queue_size=config.ingestion_queue_size,
+            embedding_batch_size=config.embedding_batch_size,
+            write_batch_size=config.write_batch_size,
+            search_dimensions=config.embedding_search_dimensions,
+        )
+        with PdfConverter(config.pdf_workers) as converter:
+            total = pipeline.run(
+                materialise_documents(itertools.chain(*sources), converter)
+            )
+
+        for line in pipeline.report():
+            logger.info(f"Ingestion {line}")
+
+        with get_cursor(config.database_url) as cur:
+            for source_type, source_path in completed:
+                upsert_ingestion_log(cur, source_type, source_path)
+    finally:
+        # The search reuses the loaded embedding model from the registry
+        embedder.close()
+        if total > 0:
+            spinner.stop(f"Ingested {total} document(s)")
+        else:
+            spinner.stop("Ingestion complete: all documents up to date")
+
+
+def _rebuild_vector_index(config: Config) -> None:
+    """Rebuild the vector index with the configured build parameters."""
+    spinner = Spinner("Rebuilding vector index", inline=True)
+    spinner.start()
+    try:
+        with get_cursor(config.database_url) as cur:
+            rebuild_vector_index(
+                cur,
+                index_type=config.vector_index_type,
+                hnsw_m=config.hnsw_m,
+                hnsw_ef_construction=config.hnsw_ef_construction,
+                ivfflat_lists=config.ivfflat_lists,
+                search_dimensions=config.embedding_search_dimensions,
+                quantization=config.vector_quantization,
+            )
+    except Exception:
+        spinner.stop("Failed to rebuild vector index")
+        raise
+    logger.info(f"Rebuilt {config.vector_index_type} vector index")
+    spinner.stop(f"Rebuilt {config.vector_index_type} vector index")
+
+
+def _interactive_loop(agent: RetrievalAgent) -> None:
+    """Run the interactive query loop."""
+    print("\nReady for questions. Type 'quit' or 'exit' to stop.\n")
+
+    while True:
+        try:
+            query = input("You: ").strip()
+        except (EOFError, KeyboardInterrupt):
+            print("\nGoodbye!")
+            break
+
+        if not query:
+            continue
+
+        if query.lower() in ("quit", "exit"):
+            print("Goodbye!")
+            break
+
+        state, progress_callback = _create_progress_callback()
+        agent.set_progress_callback(progress_callback)
+
+        try:
+            response = agent.process_query(query)
+            print(f"Assistant: {response}\n")
+
+            sources = agent.get_last_results()
+            if sources:
+                print("Sources:")
+                seen = set()
+                for result in sources:
+                    if result.file_name not in seen:
+                        seen.add(result.file_name)
+                        print(f"  - {result.file_name}")
+                print()
+        except Exception as e:
+            spinner = state["spinner"]
+            if isinstance(spinner, Spinner):
+                spinner.stop("Error")
+            print(f"Error: {e}\n")
+            logger.error(f"Query error: {e}", exc_info=True)
+
+
+def _create_progress_callback() -> (
+    tuple[dict[str, Spinner | None | bool | str], ProgressCallback]
+):
+    """Create a progress callback that manages a spinner."""
+    state: dict[str, Spinner | None | bool | str] = {
+        "spinner": None,
+        "first": True,
+        "last_stage": "",
+    }
+
+    def callback(stage: str, is_starting: bool) -> None:
+        if is_starting:
+            current_spinner = state["spinner"]
+            if isinstance(current_spinner, Spinner):
+                last_stage = state.get("last_stage", "")
+                if isinstance(last_stage, str):
+                    current_spinner.stop(last_stage, newline=False)
+
+            is_first = state["first"]
+            state["first"] = False
+            new_spinner = Spinner(stage, inline=not is_first)
+            new_spinner.start()
+            state["spinner"] = new_spinner
+            state["last_stage"] = stage
+        else:
+            current_spinner = state["spinner"]
+            if isinstance(current_spinner, Spinner):
+                is_final = stage == "Answered"
+                current_spinner.stop(stage, newline=is_final)
+                state["spinner"] = None
+
+    return state, callback
+
+
+def single_query(agent: RetrievalAgent, query: str) -> None:
+    """Process a single query and exit."""
+    state, progress_callback = _create_progress_callback()
+    agent.set_progress_callback(progress_callback)
+
+    try:
+        response = agent.process_query(query)
+        print(response)
+
+        sources = agent.get_last_results()
+        if sources:
+            print("\nSources:")
+            seen = set()
+            for result in sources:
+                if result.file_name not in seen:
+                    seen.add(result.file_name)
+                    print(f"  - {result.file_name}")
+    except Exception as e:
+        spinner = state["spinner"]
+        if isinstance(spinner, Spinner):
+            spinner.stop("Error")
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def run() -> None:
+    """Ingest documents then answer queries from the command line."""
+    logger.info("Starting nasi-ayam")
+
+    clear_history = "-c" in sys.argv
+    if clear_history:
+        sys.argv.remove("-c")
+
+    ingest_only = "-i" in sys.argv
+    if ingest_only:
+        sys.argv.remove("-i")
+
+    reindex = "-r" in sys.argv
+    if reindex:
+        sys.argv.remove("-r")
+
+    config = Config.from_env()
+    configure_pool(config.database_pool_min_size, config.database_pool_max_size)
+    configure_models(config.model_cache_path)
+
+    if clear_history:
+        _run_migrations(config.database_url)
+        with get_cursor(config.database_url) as cur:
+            count = clear_messages(cur)
+        print(f"Cleared {count} message(s)")
+        return
+
+    if reindex:
+        _run_migrations(config.database_url)
+        _rebuild_vector_index(config)
+        return
+
+    _run_migrations(config.database_url)
+
+    _run_ingestion(config)
+
+    if ingest_only:
+        return
+
+    memory_index = None
+    if config.vector_search_backend != "postgres":
+        memory_index = MemoryVectorIndex(
+            database_url=config.database_url,
+            cache_path=config.memory_index_path,
+            mode=config.vector_search_backend,
+            refresh_seconds=config.memory_index_refresh_seconds,
+            hnsw_m=config.hnsw_m,
+            hnsw_ef_construction=config.hnsw_ef_construction,
+            hnsw_ef_search=config.hnsw_ef_search,
+        )
+
+    agent = RetrievalAgent(
+        database_url=config.database_url,
+        anthropic_api_key=config.anthropic_api_key,
+        relevant_document_result_count=config.relevant_document_result_count,
+        initial_retrieval_count=config.initial_retrieval_count,
+        max_context_characters=config.max_context_characters,
+        reranker_model=config.reranker_model,
+        hnsw_ef_search=config.hnsw_ef_search,
+        ivfflat_probes=config.ivfflat_probes,
+        query_embedding_cache_size=config.query_embedding_cache_size,
+        query_embedding_cache_persistent_size=(
+            config.query_embedding_cache_persistent_size
+        ),
+        rerank_cache_size=config.rerank_cache_size,
+        search_cache_size=config.search_cache_size,
+        embedding_backend=config.embedding_backend,
+        reranker_backend=config.reranker_backend,
+        search_dimensions=config.embedding_search_dimensions,
+        rescore_factor=config.rescore_factor,
+        vector_quantization=config.vector_quantization,
+        memory_index=memory_index,
+        adaptive_rerank_margin=config.adaptive_rerank_margin,
+        cascade_candidate_count=config.cascade_candidate_count,
+        first_pass_reranker_model=config.first_pass_reranker_model,
+    )
+
+    try:
+        if len(sys.argv) > 1:
+            query = " ".join(sys.argv[1:])
+            single_query(agent, query)
+        else:
+            _interactive_loop(agent)
+    finally:
+        agent.close()
@@ -1,113 +1,287 @@
 """Database connection and query management."""
 
+import atexit
+import os
+import threading
+import time
 from contextlib import contextmanager
-from typing import Any, Generator, cast
+from dataclasses import astuple, dataclass, fields
+from typing import Any, Generator, Iterable, cast
 from uuid import UUID
 
+import numpy as np
 import psycopg
+from psycopg import sql
 from psycopg.rows import dict_row
+from pgvector.psycopg import register_vector  # type: ignore[import-untyped]
+from psycopg_pool import ConnectionPool
 
+from nasi_ayam.logging import get_logger
 
-def get_connection(database_url: str) -> psycopg.Connection[dict[str, Any]]:
-    """Create a new database connection."""
-    return psycopg.connect(database_url, row_factory=dict_row)
+logger = get_logger("database")
+
+
+def uuid7() -> UUID:
+    """Generate a time-ordered UUIDv7 client side, matching the uuidv7() default.
+
+    Lets callers know the IDs of rows before they are written.
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    random_bits = int.from_bytes(os.urandom(10))
+    value = (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+    value |= 0x7 << 76
+    value |= (random_bits >> 68) << 64
+    value |= 0b10 << 62
+    value |= random_bits & 0x3FFF_FFFF_FFFF_FFFF
+    return UUID(int=value)
+
+
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_MAX_SIZE = 10
+
+_pools: dict[str, ConnectionPool] = {}
+_pool_lock = threading.Lock()
+_pool_sizes = (DEFAULT_POOL_MIN_SIZE, DEFAULT_POOL_MAX_SIZE)
+
+
+def configure_pool(min_size: int, max_size: int) -> None:
+    """Set the size of connection pools created after this call."""
+    global _pool_sizes
+    _pool_sizes = (min_size, max_size)
+
+
+def _configure_connection(conn: psycopg.Connection[Any]) -> None:
+    """Register the pgvector types on a new pooled connection.
+
+    The vector extension is created by the migrations, which run before the
+    pool is first used.
+    """
+    try:
+        register_vector(conn)
+    except psycopg.ProgrammingError:
+        logger.warning("The vector extension is not installed in the database")
+    conn.commit()
+
+
+def get_pool(database_url: str) -> ConnectionPool:
+    """Get the process-wide connection pool for a database, creating it if needed.
+
+    Connections are checked before being handed out, so ones dropped by the
+    server are replaced rather than failing the caller.
+    """
+    with _pool_lock:
+        pool = _pools.get(database_url)
+        if pool is None:
+            if not _pools:
+                atexit.register(close_pools)
+            min_size, max_size = _pool_sizes
+            logger.info(f"Opening connection pool (min={min_size}, max={max_size})")
+            pool = ConnectionPool(
+                database_url,
+                min_size=min_size,
+                max_size=max_size,
+                configure=_configure_connection,
+                check=ConnectionPool.check_connection,
+                name="nasi-ayam",
+                open=True,
+            )
+            _pools[database_url] = pool
+        return pool
+
+
+def close_pools() -> None:
+    """Close every connection pool."""
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
 
 
 @contextmanager
 def get_cursor(
     database_url: str,
 ) -> Generator[psycopg.Cursor[dict[str, Any]], None, None]:
-    """Context manager for database cursor with automatic commit/rollback."""
-    conn = get_connection(database_url)
-    try:
-        with conn.cursor() as cur:
+    """Context manager for a pooled database cursor with automatic
+    commit/rollback."""
+    with get_pool(database_url).connection() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
             yield cur
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
-    finally:
-        conn.close()
 
 
-def insert_document(
+@dataclass
+class DocumentRecord:
+    """A row of the documents table, written by ``copy_documents``."""
+
+    id: UUID
+    source: str
+    file_path: str
+    file_name: str
+    doc_type: str
+    content_hash: str
+    file_size: int
+    blob_sha: str | None = None
+    mtime_ns: int | None = None
+    inode: int | None = None
+
+
+@dataclass
+class SemanticChunkRecord:
+    """A row of the semantic_chunks table, written by ``copy_semantic_chunks``."""
+
+    id: UUID
+    document_id: UUID
+    content: str
+    heading_path: str
+    start_position: int
+    end_position: int
+
+
+DOCUMENT_COLUMNS = [f.name for f in fields(DocumentRecord)]
+SEMANTIC_CHUNK_COLUMNS = [f.name for f in fields(SemanticChunkRecord)]
+
+
+def _copy_rows(
     cur: psycopg.Cursor[dict[str, Any]],
-    source: str,
-    file_path: str,
-    file_name: str,
-    doc_type: str,
-    content_hash: str,
-    file_size: int,
-) -> UUID:
-    """Insert a new document record and return its ID."""
+    table: str,
+    columns: list[str],
+    records: Iterable[Any],
+) -> int:
+    """Stream records into a table with COPY and return the number written."""
+    statement = sql.SQL("COPY {} ({}) FROM STDIN").format(
+        sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
+    )
+    count = 0
+    with cur.copy(statement) as copy:
+        for record in records:
+            copy.write_row(astuple(record))
+            count += 1
+    return count
+
+
+def copy_documents(
+    cur: psycopg.Cursor[dict[str, Any]], documents: Iterable[DocumentRecord]
+) -> int:
+    """Insert document records with a single COPY and return the count.
+
+    IDs are generated by the caller, see ``uuid7``, so no ``RETURNING`` round
+    trip is needed.
+    """
+    return _copy_rows(cur, "documents", DOCUMENT_COLUMNS, documents)
+
+
+def copy_semantic_chunks(
+    cur: psycopg.Cursor[dict[str, Any]], chunks: Iterable[SemanticChunkRecord]
+) -> int:
+    """Insert semantic chunk records with a single COPY and return the count."""
+    return _copy_rows(cur, "semantic_chunks", SEMANTIC_CHUNK_COLUMNS, chunks)
+
+
+def get_document_ids_by_path(
+    cur: psycopg.Cursor[dict[str, Any]],
+    keys: list[tuple[str, str]],
+) -> dict[tuple[str, str], UUID]:
+    """Get the IDs of the documents with the given (source, file_path) keys."""
+    if not keys:
+        return {}
+    sources, paths = zip(*keys)
     cur.execute(
         """
-        INSERT INTO documents (source, file_path, file_name, doc_type, content_hash, file_size)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        RETURNING id
+        SELECT d.id, d.source, d.file_path
+        FROM documents d
+        JOIN unnest(%s::text[], %s::text[]) AS k(source, file_path)
+            ON d.source = k.source AND d.file_path = k.file_path
         """,
-        (source, file_path, file_name, doc_type, content_hash, file_size),
+        (list(sources), list(paths)),
     )
-    result = cur.fetchone()
-    assert result is not None
-    return cast(UUID, result["id"])
+    return {(row["source"], row["file_path"]): row["id"] for row in cur.fetchall()}
+
+
+def get_document_ids(cur: psycopg.Cursor[dict[str, Any]]) -> set[UUID]:
+    """Get the IDs of every document."""
+    cur.execute("SELECT id FROM documents")
+    return {row["id"] for row in cur.fetchall()}
 
 
-def get_document_by_path(
+def get_document_versions(
     cur: psycopg.Cursor[dict[str, Any]],
     source: str,
-    file_path: str,
-) -> dict[str, Any] | None:
-    """Get a document by its source and path."""
+) -> dict[str, dict[str, Any]]:
+    """Get the ID, content hash, remote version and file stats of every
+    document from a source, keyed by path."""
     cur.execute(
         """
-        SELECT * FROM documents WHERE source = %s AND file_path = %s
+        SELECT id, file_path, content_hash, file_size, blob_sha, mtime_ns, inode
+        FROM documents WHERE source = %s
         """,
-        (source, file_path),
+        (source,),
     )
-    return cur.fetchone()
+    return {row["file_path"]: row for row in cur.fetchall()}
 
 
-def get_document_by_id(
+def update_document_version(
     cur: psycopg.Cursor[dict[str, Any]],
     document_id: UUID,
-) -> dict[str, Any] | None:
-    """Get a document by its ID."""
+    blob_sha: str | None,
+) -> None:
+    """Record the remote version of a document whose content is unchanged."""
     cur.execute(
         """
-        SELECT * FROM documents WHERE id = %s
+        UPDATE documents
+        SET blob_sha = %s, updated_at = now()
+        WHERE id = %s
         """,
-        (document_id,),
+        (blob_sha, document_id),
     )
-    return cur.fetchone()
 
 
-def delete_document(cur: psycopg.Cursor[dict[str, Any]], document_id: UUID) -> None:
-    """Delete a document and its associated semantic chunks."""
-    cur.execute("DELETE FROM semantic_chunks WHERE document_id = %s", (document_id,))
-    cur.execute("DELETE FROM documents WHERE id = %s", (document_id,))
-
-
-def insert_semantic_chunk(
+def update_document_stat(
     cur: psycopg.Cursor[dict[str, Any]],
     document_id: UUID,
-    content: str,
-    heading_path: str,
-    start_position: int,
-    end_position: int,
-) -> UUID:
-    """Insert a new semantic chunk and return its ID."""
+    mtime_ns: int,
+    inode: int,
+) -> None:
+    """Record the file stats of a local document whose content is unchanged."""
     cur.execute(
         """
-        INSERT INTO semantic_chunks (document_id, content, heading_path, start_position, end_position)
-        VALUES (%s, %s, %s, %s, %s)
-        RETURNING id
+        UPDATE documents SET mtime_ns = %s, inode = %s, updated_at = now()
+        WHERE id = %s
         """,
-        (document_id, content, heading_path, start_position, end_position),
+        (mtime_ns, inode, document_id),
     )
-    result = cur.fetchone()
-    assert result is not None
-    return cast(UUID, result["id"])
+
+
+def delete_documents(
+    cur: psycopg.Cursor[dict[str, Any]], document_ids: list[UUID]
+) -> None:
+    """Delete several documents with their semantic and vector chunks."""
+    if not document_ids:
+        return
+    cur.execute(
+        "DELETE FROM vector_chunks WHERE document_id = ANY(%s)", (document_ids,)
+    )
+    cur.execute(
+        "DELETE FROM semantic_chunks WHERE document_id = ANY(%s)", (document_ids,)
+    )
+    cur.execute("DELETE FROM documents WHERE id = ANY(%s)", (document_ids,))
+
+
+def get_corpus_generation(cur: psycopg.Cursor[dict[str, Any]]) -> int:
+    """Get the corpus generation, which changes whenever documents do."""
+    cur.execute("SELECT generation FROM corpus_generation")
+    row = cur.fetchone()
+    return 0 if row is None else int(row["generation"])
+
+
+def bump_corpus_generation(cur: psycopg.Cursor[dict[str, Any]]) -> int:
+    """Advance the corpus generation after documents are inserted or deleted,
+    invalidating anything cached against the previous generation."""
+    cur.execute("""
+        UPDATE corpus_generation
+        SET generation = generation + 1, updated_at = now()
+        RETURNING generation
+        """)
+    row = cur.fetchone()
+    return 0 if row is None else int(row["generation"])
 
 
 def get_semantic_chunks_by_ids(
@@ -126,6 +300,54 @@ def get_semantic_chunks_by_ids(
     return list(cur.fetchall())
 
 
+def get_query_embedding(
+    cur: psycopg.Cursor[dict[str, Any]], model: str, query_hash: str
+) -> np.ndarray | None:
+    """Get a cached query embedding, marking it as recently used."""
+    cur.execute(
+        """
+        UPDATE query_embeddings SET used_at = now()
+        WHERE model = %s AND query_hash = %s
+        RETURNING embedding
+        """,
+        (model, query_hash),
+    )
+    row = cur.fetchone()
+    return None if row is None else cast(np.ndarray, row["embedding"])
+
+
+def store_query_embedding(
+    cur: psycopg.Cursor[dict[str, Any]],
+    model: str,
+    query_hash: str,
+    embedding: np.ndarray,
+    max_entries: int,
+) -> None:
+    """Cache a query embedding, evicting the least recently used beyond
+    ``max_entries`` for the model."""
+    cur.execute(
+        """
+        INSERT INTO query_embeddings (model, query_hash, embedding)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (model, query_hash)
+        DO UPDATE SET embedding = EXCLUDED.embedding, used_at = now()
+        """,
+        (model, query_hash, embedding),
+    )
+    cur.execute(
+        """
+        DELETE FROM query_embeddings
+        WHERE model = %s AND query_hash IN (
+            SELECT query_hash FROM query_embeddings
+            WHERE model = %s
+            ORDER BY used_at DESC
+            OFFSET %s
+        )
+        """,
+        (model, model, max_entries),
+    )
+
+
 def insert_message(
     cur: psycopg.Cursor[dict[str, Any]],
     role: str,
@@ -1,6 +1,7 @@
 """Agentic reasoning loop for document retrieval and response generation."""
 
 from typing import Annotated, Any, cast
+from uuid import UUID
 
 from langchain_anthropic import ChatAnthropic
 from langchain_core.messages import AIMessage, HumanMessage
@@ -10,11 +11,14 @@ from langgraph.prebuilt import create_react_agent
 from nasi_ayam.generation.conversation import ConversationManager
 from nasi_ayam.logging import get_logger
 from nasi_ayam.progress import ProgressCallback
+from nasi_ayam.retrieval.memory_index import MemoryVectorIndex
 from nasi_ayam.retrieval.search import DocumentSearch, SearchResult
+from nasi_ayam.vector_store import DEFAULT_RESCORE_FACTOR
 
 logger = get_logger("agent")
 
 MAX_ITERATIONS = 3
+MAX_CONTEXT_EXPANSIONS = 3
 
 SYSTEM_PROMPT = """You are a helpful knowledge retrieval assistant. Your role is to answer questions by searching through a document database.
 
@@ -23,8 +27,9 @@ IMPORTANT: You MUST always search first before responding. Never ask for clarifi
 When answering questions:
 1. ALWAYS use the search_documents tool first - do not respond without searching
 2. If the results aren't sufficient, use refine_search with different keywords
-3. Always cite your sources by mentioning the document source and relevant context
-4. If you cannot find relevant information after {max_iterations} search attempts, acknowledge this honestly
+3. If a result looks relevant but its content is too short to answer from, use expand_context with one of the context ids listed for it to read the whole section
+4. Always cite your sources by mentioning the document source and relevant context
+5. If you cannot find relevant information after {max_iterations} search attempts, acknowledge this honestly
 
 You have access to documents from two sources:
 - "local": Documents from the local filesystem
@@ -46,12 +51,44 @@ class RetrievalAgent:
         initial_retrieval_count: int,
         max_context_characters: int,
         reranker_model: str,
+        hnsw_ef_search: int | None = None,
+        ivfflat_probes: int | None = None,
+        query_embedding_cache_size: int = 0,
+        query_embedding_cache_persistent_size: int = 0,
+        rerank_cache_size: int = 0,
+        search_cache_size: int = 0,
+        embedding_backend: str = "torch",
+        reranker_backend: str = "torch",
+        search_dimensions: int | None = None,
+        rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+        vector_quantization: str = "none",
+        memory_index: MemoryVectorIndex | None = None,
+        adaptive_rerank_margin: float = 0.0,
+        cascade_candidate_count: int | None = None,
+        first_pass_reranker_model: str | None = None,
     ) -> None:
         self._database_url = database_url
         self._anthropic_api_key = anthropic_api_key
         self._top_k = relevant_document_result_count
         self._search = DocumentSearch(
-            database_url, reranker_model, initial_retrieval_count
+            database_url=database_url,
+            reranker_model=reranker_model,
+            initial_retrieval_count=initial_retrieval_count,
+            hnsw_ef_search=hnsw_ef_search,
+            ivfflat_probes=ivfflat_probes,
+            query_embedding_cache_size=query_embedding_cache_size,
+            query_embedding_cache_persistent_size=query_embedding_cache_persistent_size,
+            rerank_cache_size=rerank_cache_size,
+            search_cache_size=search_cache_size,
+            embedding_backend=embedding_backend,
+            reranker_backend=reranker_backend,
+            search_dimensions=search_dimensions,
+            rescore_factor=rescore_factor,
+            vector_quantization=vector_quantization,
+            memory_index=memory_index,
+            adaptive_rerank_margin=adaptive_rerank_margin,
+            cascade_candidate_count=cascade_candidate_count,
+            first_pass_reranker_model=first_pass_reranker_model,
         )
         self._conversation = ConversationManager(
             database_url, anthropic_api_key, max_context_characters
@@ -64,6 +101,10 @@ class RetrievalAgent:
         self._progress_callback = callback
         self._search.set_progress_callback(callback)
 
+    def close(self) -> None:
+        """Release the search models."""
+        self._search.close()
+
     def _report_progress(self, stage: str, is_starting: bool) -> None:
         if self._progress_callback:
             self._progress_callback(stage, is_starting)
@@ -96,13 +137,15 @@ class RetrievalAgent:
                 contexts = ""
                 if result.semantic_contexts:
                     context_paths = [
-                        c.get("heading_path", "") for c in result.semantic_contexts
+                        f"{c.heading_path} [id: {c.id}]"
+                        for c in result.semantic_contexts
                     ]
-                    contexts = f" (Context: {', '.join(filter(None, context_paths))})"
+                    contexts = f" (Context: {', '.join(context_paths)})"
 
+                score_label = "Score" if result.reranked else "Vector similarity"
                 output_parts.append(
                     f"{i}. [{result.source}/{result.doc_type}]{contexts}\n"
-                    f"   Score: {result.score:.3f}\n"
+                    f"   {score_label}: {result.score:.3f}\n"
                     f"   Content: {result.content[:500]}{'...' if len(result.content) > 500 else ''}"
                 )
 
@@ -115,7 +158,23 @@ class RetrievalAgent:
             """Search again with different or expanded keywords."""
             return cast(str, search_documents.invoke({"query": new_keywords}))
 
-        return [search_documents, refine_search]
+        @tool
+        def expand_context(
+            context_id: Annotated[
+                str, "The id of a context listed in the search results"
+            ],
+        ) -> str:
+            """Fetch the full text of a document section listed as a search result's context."""
+            try:
+                semantic_chunk = search.expand_context(UUID(context_id))
+            except ValueError:
+                return f"Invalid context id: {context_id}"
+
+            if semantic_chunk is None:
+                return f"No context found with id {context_id}"
+            return f"Context: {semantic_chunk['heading_path']}\n\n{semantic_chunk['content']}"
+
+        return [search_documents, refine_search, expand_context]
 
     def _create_agent(self) -> Any:
         """Create the ReAct agent."""
@@ -149,7 +208,7 @@ class RetrievalAgent:
         history = self._conversation.get_langchain_messages()
         messages = history[:-1] + [HumanMessage(content=query)]
 
-        config = {"recursion_limit": MAX_ITERATIONS * 2 + 5}
+        config = {"recursion_limit": (MAX_ITERATIONS + MAX_CONTEXT_EXPANSIONS) * 2 + 5}
 
         try:
             result = agent.invoke({"messages": messages}, config=config)
@@ -1,112 +1,125 @@
-"""Embedding generation and vector storage using LangChain PGVector."""
+"""Embedding generation for vector chunks."""
 
-import io
-from contextlib import redirect_stderr, redirect_stdout
+import threading
+import time
 from typing import cast
-from uuid import UUID
 
-from langchain_postgres import PGVector
 from sentence_transformers import SentenceTransformer
 
 from nasi_ayam.ingestion.chunker import VectorChunk
 from nasi_ayam.logging import get_logger
+from nasi_ayam.models import (
+    acquire_sentence_transformer,
+    registry,
+    sentence_transformer_key,
+)
 
 logger = get_logger("embedder")
 
 EMBEDDING_MODEL = "nomic-ai/nomic-embed-text-v1.5"
-EMBEDDING_DIMENSIONS = 768
-COLLECTION_NAME = "document_chunks"
 
 
 class Embedder:
-    """Handles embedding generation and vector storage."""
+    """Generates embeddings for vector chunks.
 
-    def __init__(self, database_url: str) -> None:
-        self._database_url = database_url.replace(
-            "postgresql://", "postgresql+psycopg://", 1
-        )
+    The model is shared through the model registry, call ``close`` once
+    ingestion is done to release it.
+    """
+
+    def __init__(self, backend: str = "torch") -> None:
+        self._backend = backend
         self._model: SentenceTransformer | None = None
-        self._vector_store: PGVector | None = None
+        # The ingestion pipeline may load the model from more than one thread
+        self._lock = threading.Lock()
 
     @property
     def model(self) -> SentenceTransformer:
-        if self._model is None:
-            logger.info(f"Loading embedding model: {EMBEDDING_MODEL}")
-            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
-                self._model = SentenceTransformer(
-                    EMBEDDING_MODEL, trust_remote_code=True
+        with self._lock:
+            if self._model is None:
+                self._model = acquire_sentence_transformer(
+                    EMBEDDING_MODEL, self._backend
                 )
-        return self._model
-
-    @property
-    def vector_store(self) -> PGVector:
-        if self._vector_store is None:
-            logger.info("Initializing PGVector store")
-            self._vector_store = PGVector(
-                collection_name=COLLECTION_NAME,
-                connection=self._database_url,
-                embeddings=SentenceTransformerEmbeddings(self.model),  # type: ignore[arg-type]
-            )
-        return self._vector_store
-
-    def embed_chunks(
-        self,
-        chunks: list[VectorChunk],
-        document_id: UUID,
-        source: str,
-        doc_type: str,
-    ) -> list[str]:
-        """Embed vector chunks and store them in the vector database.
-
-        Args:
-            chunks: List of vector chunks to embed.
-            document_id: The parent document's database ID.
-            source: Document source (local/github).
-            doc_type: Document type (md/txt/pdf).
+            return self._model
+
+    def close(self) -> None:
+        """Release the model, it stays loaded for other users."""
+        with self._lock:
+            if self._model is not None:
+                registry.release(
+                    sentence_transformer_key(EMBEDDING_MODEL, self._backend)
+                )
+                self._model = None
 
-        Returns:
-            List of IDs assigned to the stored vectors.
-        """
+    def encode(
+        self, chunks: list[VectorChunk], batch_size: int = 32
+    ) -> list[list[float]]:
+        """Generate embeddings for vector chunks."""
         if not chunks:
             return []
 
         texts = [chunk.content for chunk in chunks]
-        metadatas = [
-            {
-                "document_id": str(document_id),
-                "source": source,
-                "doc_type": doc_type,
-                "start_position": chunk.start_position,
-                "end_position": chunk.end_position,
-                "semantic_chunk_ids": [str(id) for id in chunk.semantic_chunk_ids],
-            }
-            for chunk in chunks
-        ]
+        embeddings = self.model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True
+        )
+        return cast(list[list[float]], embeddings.tolist())
+
 
-        logger.info(f"Embedding {len(chunks)} chunks for document {document_id}")
-        ids = self.vector_store.add_texts(texts=texts, metadatas=metadatas)
-        logger.debug(f"Stored {len(ids)} vectors")
+class EmbeddingBatcher:
+    """Encodes vector chunks gathered from many documents in large batches.
 
-        return ids
+    Small documents only produce a handful of chunks each, so encoding them
+    one document at a time leaves the model mostly idle. The batcher encodes
+    the chunks of several documents together, ordered by length so each model
+    batch holds texts of similar size and wastes less padding, then routes
+    the embeddings back to the documents they came from.
+    """
 
-    def delete_by_document(self, document_id: UUID) -> None:
-        """Delete all vectors associated with a document."""
-        logger.info(f"Deleting vectors for document {document_id}")
-        self.vector_store.delete(filter={"document_id": str(document_id)})
+    def __init__(self, embedder: Embedder, batch_size: int) -> None:
+        self._embedder = embedder
+        self._batch_size = batch_size
+        self.chunks = 0
+        self.seconds = 0.0
 
+    @property
+    def batch_size(self) -> int:
+        return self._batch_size
 
-class SentenceTransformerEmbeddings:
-    """LangChain-compatible wrapper for SentenceTransformer."""
+    @property
+    def chunks_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.chunks / self.seconds
 
-    def __init__(self, model: SentenceTransformer) -> None:
-        self._model = model
+    def encode(self, documents: list[list[VectorChunk]]) -> list[list[list[float]]]:
+        """Embed the vector chunks of several documents in one pass.
 
-    def embed_documents(self, texts: list[str]) -> list[list[float]]:
-        """Embed a list of documents."""
-        embeddings = self._model.encode(texts, convert_to_numpy=True)
-        return cast(list[list[float]], embeddings.tolist())
+        Args:
+            documents: The vector chunks of each document.
 
-    def embed_query(self, text: str) -> list[float]:
-        """Embed a single query."""
-        embedding = self._model.encode(text, convert_to_numpy=True)
-        return cast(list[float], embedding.tolist())
+        Returns:
+            The embeddings of each document, in the same order as its chunks.
+        """
+        positions = [
+            (doc_index, chunk_index)
+            for doc_index, chunks in enumerate(documents)
+            for chunk_index in range(len(chunks))
+        ]
+        positions.sort(key=lambda p: len(documents[p[0]][p[1]].content), reverse=True)
+
+        started = time.perf_counter()
+        embeddings = self._embedder.encode(
+            [documents[doc][chunk] for doc, chunk in positions], self._batch_size
+        )
+        self.seconds += time.perf_counter() - started
+        self.chunks += len(positions)
+
+        results: list[list[list[float]]] = [
+            [[] for _ in chunks] for chunks in documents
+        ]
+        for (doc_index, chunk_index), embedding in zip(positions, embeddings):
+            results[doc_index][chunk_index] = embedding
+
+        logger.debug(
+            f"Embedded {len(positions)} chunks from {len(documents)} documents"
+        )
+        return results
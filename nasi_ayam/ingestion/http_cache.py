@@ -0,0 +1,123 @@
+"""Persistent on-disk cache of HTTP responses for conditional requests.
+
+Responses that carry an ``ETag`` or ``Last-Modified`` header are stored on disk
+keyed by URL. Later requests for the same URL send ``If-None-Match`` and
+``If-Modified-Since`` so an unchanged resource comes back as an empty
+``304 Not Modified``, which GitHub does not count against the rate limit.
+Entries for URLs that are no longer in use are removed with ``prune``.
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable
+
+import httpx
+
+from nasi_ayam.logging import get_logger
+
+logger = get_logger("http_cache")
+
+
+@dataclass
+class CachedResponse:
+    """A response body stored on disk along with its validators."""
+
+    content: bytes
+    etag: str | None
+    last_modified: str | None
+
+
+class HttpCache:
+    """Stores response bodies and validators in a directory, one pair per URL."""
+
+    def __init__(self, directory: str | Path) -> None:
+        self._directory = Path(directory)
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = _key(url)
+        return self._directory / f"{key}.json", self._directory / f"{key}.body"
+
+    def load(self, url: str) -> CachedResponse | None:
+        """Get the cached response for a URL, if there is a usable one."""
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            content = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(
+            content=content,
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+        )
+
+    def store(self, url: str, response: httpx.Response) -> None:
+        """Cache a successful response if it can be revalidated later."""
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if etag is None and last_modified is None:
+            return
+
+        meta_path, body_path = self._paths(url)
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            _write_atomic(body_path, response.content)
+            _write_atomic(
+                meta_path,
+                json.dumps(
+                    {"url": url, "etag": etag, "last_modified": last_modified}
+                ).encode("utf-8"),
+            )
+        except OSError as e:
+            logger.warning(f"Failed to cache response for {url}: {e}")
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Remove every cached response except those for the given URLs.
+
+        Returns:
+            The number of responses removed.
+        """
+        keys = {_key(url) for url in keep}
+        removed = 0
+        try:
+            paths = list(self._directory.iterdir())
+        except OSError:
+            return 0
+        for path in paths:
+            if path.suffix not in (".json", ".body") or path.stem in keys:
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning(f"Failed to prune cached response {path}: {e}")
+                continue
+            removed += path.suffix == ".json"
+        if removed:
+            logger.info(f"Pruned {removed} cached response(s)")
+        return removed
+
+
+def _key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def conditional_headers(cached: CachedResponse | None) -> dict[str, str]:
+    """Build the request headers that revalidate a cached response."""
+    headers: dict[str, str] = {}
+    if cached is None:
+        return headers
+    if cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+    return headers
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write a file via a temporary sibling so readers never see partial data."""
+    tmp_path = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(path)
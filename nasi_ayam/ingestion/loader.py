@@ -1,13 +1,30 @@
 """Document loaders for local filesystem and GitHub."""
 
+import asyncio
 import contextlib
+import fnmatch
 import hashlib
 import io
+import multiprocessing
+import os
 import re
-import time
-from dataclasses import dataclass
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Iterator, cast
+from types import TracebackType
+from typing import (
+    Any,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+    TypeVar,
+    cast,
+)
 
 import httpx
 
@@ -15,22 +32,75 @@ with contextlib.redirect_stdout(io.StringIO()):
     import pymupdf4llm  # type: ignore[import-untyped]
 
 from nasi_ayam.ingestion.chunker import DocType
+from nasi_ayam.ingestion.http_cache import (
+    CachedResponse,
+    HttpCache,
+    conditional_headers,
+)
 from nasi_ayam.logging import get_logger
 
 logger = get_logger("loader")
 
+T = TypeVar("T")
+
+GITHUB_HEADERS = {"Accept": "application/vnd.github.v3+json"}
+GITHUB_TIMEOUT = 30.0
+DEFAULT_GITHUB_CONCURRENCY = 8
+
+DEFAULT_LOCAL_READ_WORKERS = 8
+
+# Files queued per reader thread ahead of the document currently being yielded
+LOCAL_READ_AHEAD_PER_WORKER = 4
+
+# Conversions queued per worker ahead of the document currently being yielded
+PDF_PREFETCH_PER_WORKER = 2
+
 
 @dataclass
 class LoadedDocument:
-    """A document loaded from a source."""
+    """A document loaded from a source.
+
+    Only the raw bytes are held until ``content`` is first accessed, when they
+    are decoded or converted from PDF. Callers can therefore compare
+    ``content_hash`` with the stored copy before paying for the conversion.
+    """
 
     source: str
     file_path: str
     file_name: str
     doc_type: DocType
-    content: str
     content_hash: str
     file_size: int
+    raw_content: bytes = field(repr=False)
+    local_path: str | None = field(default=None, repr=False)
+    blob_sha: str | None = None
+    mtime_ns: int | None = None
+    inode: int | None = None
+    _content: str | None = field(default=None, init=False, repr=False)
+
+    @property
+    def pdf_source(self) -> str | bytes:
+        """The file path for local PDFs, otherwise the raw PDF bytes."""
+        return self.local_path or self.raw_content
+
+    @property
+    def is_materialised(self) -> bool:
+        return self._content is not None
+
+    @property
+    def content(self) -> str:
+        if self._content is None:
+            if self.doc_type == DocType.PDF:
+                logger.debug(f"Converting PDF to markdown: {self.file_name}")
+                self._set_content(_convert_pdf(self.pdf_source))
+            else:
+                self._set_content(self.raw_content.decode("utf-8"))
+        assert self._content is not None
+        return self._content
+
+    def _set_content(self, content: str) -> None:
+        self._content = content
+        self.raw_content = b""
 
 
 def calculate_content_hash(content: bytes) -> str:
@@ -55,55 +125,372 @@ def convert_pdf_to_markdown(pdf_path: str | Path) -> str:
     return cast(str, pymupdf4llm.to_markdown(str(pdf_path)))
 
 
-def load_local_documents(directory: str) -> Iterator[LoadedDocument]:
-    """Load documents from a local directory.
+def _convert_pdf(pdf_source: str | bytes) -> str:
+    """Convert a PDF given as a file path or raw bytes to markdown."""
+    if isinstance(pdf_source, bytes):
+        return convert_pdf_from_bytes(pdf_source)
+    return convert_pdf_to_markdown(pdf_source)
+
+
+class PdfConverter:
+    """Converts PDFs to markdown, optionally across a pool of worker processes.
+
+    With zero workers conversions run synchronously on the calling thread,
+    otherwise they are submitted to a lazily created process pool.
+    """
+
+    def __init__(self, workers: int = 0) -> None:
+        self._workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def max_in_flight(self) -> int:
+        """Number of conversions that may be queued ahead of the consumer."""
+        return self._workers * PDF_PREFETCH_PER_WORKER
+
+    def submit(self, pdf_source: str | bytes) -> "Future[str]":
+        """Start converting a PDF and return a future for its markdown."""
+        if self._workers <= 0:
+            future: Future[str] = Future()
+            try:
+                future.set_result(_convert_pdf(pdf_source))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        if self._pool is None:
+            logger.info(f"Starting PDF conversion pool with {self._workers} workers")
+            # Ingestion runs many threads, which fork can copy held locks from,
+            # so workers are started fresh
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool.submit(_convert_pdf, pdf_source)
+
+    def restart(self) -> None:
+        """Discard the worker pool so the next submission starts a fresh one."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "PdfConverter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+@dataclass
+class _PendingDocument:
+    """A document whose PDF content may still be converting."""
+
+    document: LoadedDocument
+    future: "Future[str] | None"
+
+
+def _converted(future: "Future[str] | None") -> bool:
+    """Check whether a conversion future finished successfully."""
+    if future is None or future.cancelled() or not future.done():
+        return False
+    return future.exception() is None
+
+
+def _resolve_pending(
+    pending: _PendingDocument,
+    window: deque[_PendingDocument],
+    converter: PdfConverter,
+) -> LoadedDocument | None:
+    """Wait for a pending document's conversion to finish.
+
+    Returns None if the PDF could not be converted.
+    """
+    document = pending.document
+    if pending.future is None:
+        return document
+
+    try:
+        content = pending.future.result()
+    except BrokenProcessPool:
+        retried = _retry_after_crash(document, window, converter)
+        if retried is None:
+            return None
+        content = retried
+    except Exception as e:
+        logger.warning(f"Failed to convert {document.file_name}: {e}")
+        return None
+
+    document._set_content(content)
+    return document
+
+
+def _retry_after_crash(
+    document: LoadedDocument,
+    window: deque[_PendingDocument],
+    converter: PdfConverter,
+) -> str | None:
+    """Recover from a worker process dying mid-conversion.
+
+    A dead worker takes the whole pool down with it, so the document is retried
+    alone in a fresh pool: if it breaks the pool again it is the culprit and is
+    skipped. Everything else still waiting in the window is then resubmitted.
+    """
+    name = document.file_name
+    logger.warning(f"PDF worker crashed, retrying {name} in a fresh pool")
+    converter.restart()
+
+    content: str | None = None
+    try:
+        content = converter.submit(document.pdf_source).result()
+    except BrokenProcessPool:
+        logger.warning(f"Failed to convert {name}: PDF worker crashed")
+        converter.restart()
+    except Exception as e:
+        logger.warning(f"Failed to convert {name}: {e}")
+
+    for waiting in window:
+        if waiting.future is not None and not _converted(waiting.future):
+            waiting.future = converter.submit(waiting.document.pdf_source)
+
+    return content
+
+
+def materialise_documents(
+    documents: Iterable[LoadedDocument],
+    converter: PdfConverter | None = None,
+) -> Iterator[LoadedDocument]:
+    """Decode or convert the content of documents, yielding them in source order.
+
+    Up to ``converter.max_in_flight`` documents are held back while their PDFs
+    convert in the background. A document that cannot be decoded or converted is
+    logged and skipped.
+
+    Args:
+        documents: Documents as yielded by the loaders.
+        converter: PDF converter to use, PDFs are converted inline if omitted.
+
+    Yields:
+        Each document with its content available.
+    """
+    converter = converter or PdfConverter()
+    window: deque[_PendingDocument] = deque()
+
+    for document in documents:
+        future: Future[str] | None = None
+        if document.doc_type == DocType.PDF and not document.is_materialised:
+            logger.debug(f"Converting PDF to markdown: {document.file_name}")
+            future = converter.submit(document.pdf_source)
+        else:
+            try:
+                document.content  # decode now so failures are skipped here
+            except Exception as e:
+                logger.warning(f"Failed to decode {document.file_name}: {e}")
+                continue
+        window.append(_PendingDocument(document=document, future=future))
+
+        while len(window) > converter.max_in_flight:
+            resolved = _resolve_pending(window.popleft(), window, converter)
+            if resolved is not None:
+                yield resolved
+
+    while window:
+        resolved = _resolve_pending(window.popleft(), window, converter)
+        if resolved is not None:
+            yield resolved
+
+
+FileStat = tuple[int, int, int]
+"""File system metadata of a local file: (mtime_ns, size, inode)."""
+
+
+def _matches_any(relative_path: str, name: str, patterns: Sequence[str]) -> bool:
+    """Check a path against glob patterns.
+
+    A pattern matches if it matches either the path relative to the scanned
+    directory or the bare file name, so ``*.md`` and ``drafts/*`` both work.
+    As with ``fnmatch``, ``*`` also matches ``/``.
+    """
+    return any(
+        fnmatch.fnmatchcase(relative_path, pattern)
+        or fnmatch.fnmatchcase(name, pattern)
+        for pattern in patterns
+    )
+
+
+def scan_directory(
+    directory: str,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    max_depth: int | None = None,
+) -> Iterator[tuple[str, str, DocType]]:
+    """Recursively find supported files below a directory.
+
+    Directories are listed with ``os.scandir``, which returns file types
+    without a ``stat`` call per entry. Entries are visited in name order so
+    repeated scans yield files in the same order. Symlinked directories are not
+    followed, to avoid cycles.
+
+    Args:
+        directory: Path to the directory to scan.
+        include: If not empty, only files matching one of these globs are kept.
+        exclude: Files and directories matching any of these globs are skipped.
+        max_depth: How many directory levels to descend below ``directory``,
+            0 only scans ``directory`` itself and None has no limit.
+
+    Yields:
+        Tuples of (file_path, file_name, doc_type).
+    """
+    pending = [(directory, "", 0)]
+
+    while pending:
+        path, prefix, depth = pending.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning(f"Failed to scan {path}: {e}")
+            continue
+
+        subdirectories = []
+        for entry in entries:
+            relative_path = prefix + entry.name
+            if _matches_any(relative_path, entry.name, exclude):
+                continue
+
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if max_depth is None or depth < max_depth:
+                        subdirectories.append(
+                            (entry.path, relative_path + "/", depth + 1)
+                        )
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+
+            if include and not _matches_any(relative_path, entry.name, include):
+                continue
+
+            doc_type = get_doc_type(entry.name)
+            if doc_type is None:
+                logger.debug(f"Skipping unsupported file: {relative_path}")
+                continue
+
+            yield entry.path, entry.name, doc_type
+
+        pending.extend(reversed(subdirectories))
+
+
+def _read_local_file(
+    file_path: str, file_name: str, doc_type: DocType, known_stat: FileStat | None
+) -> LoadedDocument | None:
+    """Read and hash a local file, or return None if its stats are unchanged."""
+    stat = os.stat(file_path)
+    if known_stat == (stat.st_mtime_ns, stat.st_size, stat.st_ino):
+        logger.debug(f"Skipping unchanged document: {file_name}")
+        return None
+
+    raw_content = Path(file_path).read_bytes()
+    content_hash = calculate_content_hash(raw_content)
+    file_size = len(raw_content)
+
+    logger.info(f"Loaded document: {file_name} ({file_size} bytes)")
+
+    is_pdf = doc_type == DocType.PDF
+    return LoadedDocument(
+        source="local",
+        file_path=file_path,
+        file_name=file_name,
+        doc_type=doc_type,
+        content_hash=content_hash,
+        file_size=file_size,
+        raw_content=b"" if is_pdf else raw_content,
+        local_path=file_path if is_pdf else None,
+        mtime_ns=stat.st_mtime_ns,
+        inode=stat.st_ino,
+    )
+
+
+def load_local_documents(
+    directory: str,
+    known_stats: Mapping[str, FileStat] | None = None,
+    include: Sequence[str] = (),
+    exclude: Sequence[str] = (),
+    max_depth: int | None = None,
+    workers: int = DEFAULT_LOCAL_READ_WORKERS,
+) -> Iterator[LoadedDocument]:
+    """Load documents from a local directory tree.
+
+    Files are found with ``scan_directory`` and read and hashed on a thread
+    pool, since file reads and hashlib both release the GIL. Documents are
+    yielded in scan order. Files whose modification time, size and inode all
+    match ``known_stats`` are skipped without being read. Content is not
+    decoded or converted, see ``materialise_documents``.
 
     Args:
         directory: Path to the local directory.
+        known_stats: Stats of each already ingested file, keyed by path.
+        include: If not empty, only files matching one of these globs are loaded.
+        exclude: Files and directories matching any of these globs are skipped.
+        max_depth: How many directory levels to descend, None has no limit.
+        workers: Number of threads reading and hashing files.
 
     Yields:
-        LoadedDocument for each supported file found.
+        LoadedDocument for each supported file that may have changed.
     """
     dir_path = Path(directory)
-    if not dir_path.exists():
+    if not dir_path.is_dir():
         raise FileNotFoundError(f"Directory not found: {directory}")
 
     logger.info(f"Loading documents from local directory: {directory}")
+    known_stats = known_stats or {}
+    pending: deque[tuple[str, Future[LoadedDocument | None]]] = deque()
 
-    for file_path in dir_path.iterdir():
-        if not file_path.is_file():
-            continue
-
-        doc_type = get_doc_type(file_path.name)
-        if doc_type is None:
-            logger.debug(f"Skipping unsupported file: {file_path.name}")
-            continue
-
+    def next_document() -> LoadedDocument | None:
+        file_name, future = pending.popleft()
         try:
-            raw_content = file_path.read_bytes()
-            content_hash = calculate_content_hash(raw_content)
-            file_size = len(raw_content)
-
-            if doc_type == DocType.PDF:
-                logger.debug(f"Converting PDF to markdown: {file_path.name}")
-                content = convert_pdf_to_markdown(file_path)
-            else:
-                content = raw_content.decode("utf-8")
-
-            logger.info(f"Loaded document: {file_path.name} ({file_size} bytes)")
-
-            yield LoadedDocument(
-                source="local",
-                file_path=str(file_path),
-                file_name=file_path.name,
-                doc_type=doc_type,
-                content=content,
-                content_hash=content_hash,
-                file_size=file_size,
-            )
+            return future.result()
         except Exception as e:
-            logger.warning(f"Failed to load {file_path.name}: {e}")
-            continue
+            logger.warning(f"Failed to load {file_name}: {e}")
+            return None
+
+    with ThreadPoolExecutor(workers, thread_name_prefix="local-reader") as pool:
+        for file_path, file_name, doc_type in scan_directory(
+            str(dir_path), include, exclude, max_depth
+        ):
+            future = pool.submit(
+                _read_local_file,
+                file_path,
+                file_name,
+                doc_type,
+                known_stats.get(file_path),
+            )
+            pending.append((file_name, future))
+
+            if len(pending) >= workers * LOCAL_READ_AHEAD_PER_WORKER:
+                document = next_document()
+                if document is not None:
+                    yield document
+
+        while pending:
+            document = next_document()
+            if document is not None:
+                yield document
 
 
 def parse_github_url(url: str) -> tuple[str, str, str, str]:
@@ -122,36 +509,43 @@ def parse_github_url(url: str) -> tuple[str, str, str, str]:
     return match.groups()  # type: ignore
 
 
-def github_api_request(
+async def github_api_request_async(
+    client: httpx.AsyncClient,
     url: str,
     max_retries: int = 3,
     initial_delay: float = 1.0,
+    cache: HttpCache | None = None,
 ) -> httpx.Response:
-    """Make a GitHub API request with retry logic.
+    """Make a GitHub API request on a shared async client with retry logic.
 
     Args:
+        client: The pooled client to send the request with.
         url: The API URL to request.
         max_retries: Maximum number of retry attempts.
         initial_delay: Initial delay between retries (doubles each retry).
+        cache: Optional response cache used to make the request conditional.
 
     Returns:
-        The HTTP response.
+        The HTTP response, rebuilt from the cache if the server replied 304.
 
     Raises:
         httpx.HTTPStatusError: If all retries fail.
     """
+    cached = cache.load(url) if cache else None
+    headers = conditional_headers(cached)
+
     delay = initial_delay
 
     for attempt in range(max_retries + 1):
         try:
-            with httpx.Client() as client:
-                response = client.get(
-                    url,
-                    headers={"Accept": "application/vnd.github.v3+json"},
-                    timeout=30.0,
-                )
-                response.raise_for_status()
-                return response
+            response = await client.get(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                logger.debug(f"Not modified, using cached response: {url}")
+                return _cached_response(response, cached)
+            response.raise_for_status()
+            if cache:
+                cache.store(url, response)
+            return response
         except (httpx.HTTPStatusError, httpx.RequestError) as e:
             if attempt == max_retries:
                 logger.error(
@@ -159,20 +553,77 @@ def github_api_request(
                 )
                 raise
             logger.warning(f"GitHub API request failed (attempt {attempt + 1}): {e}")
-            time.sleep(delay)
+            await asyncio.sleep(delay)
             delay *= 2
 
     raise RuntimeError("Unreachable")
 
 
-def load_github_documents(github_url: str) -> Iterator[LoadedDocument]:
+def _cached_response(
+    response: httpx.Response, cached: CachedResponse
+) -> httpx.Response:
+    """Turn a 304 Not Modified into the full response it stands for."""
+    headers = {}
+    if cached.etag:
+        headers["etag"] = cached.etag
+    if cached.last_modified:
+        headers["last-modified"] = cached.last_modified
+    return httpx.Response(
+        200, content=cached.content, headers=headers, request=response.request
+    )
+
+
+def load_github_documents(
+    github_url: str,
+    concurrency: int = DEFAULT_GITHUB_CONCURRENCY,
+    known_shas: Mapping[str, str | None] | None = None,
+    cache: HttpCache | None = None,
+) -> Iterator[LoadedDocument]:
     """Load documents from a GitHub directory.
 
+    Files are downloaded concurrently by ``aload_github_documents`` on an event
+    loop in a background thread, and yielded as each download finishes.
+
+    Args:
+        github_url: GitHub directory URL.
+        concurrency: Maximum number of downloads in flight at once.
+        known_shas: Blob SHA of each already ingested file, keyed by path.
+        cache: Optional response cache used to make requests conditional.
+
+    Yields:
+        LoadedDocument for each new or changed supported file.
+    """
+    yield from _iterate_in_background(
+        aload_github_documents(github_url, concurrency, known_shas, cache)
+    )
+
+
+async def aload_github_documents(
+    github_url: str,
+    concurrency: int = DEFAULT_GITHUB_CONCURRENCY,
+    known_shas: Mapping[str, str | None] | None = None,
+    cache: HttpCache | None = None,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> AsyncIterator[LoadedDocument]:
+    """Load documents from a GitHub directory with concurrent downloads.
+
+    Every request goes through one pooled client so connections are reused.
+    The contents listing gives the blob SHA of every file, so files whose SHA
+    matches ``known_shas`` are skipped without being downloaded. Files are
+    downloaded and hashed but their content is not decoded or converted, see
+    ``materialise_documents``. Once every file has been loaded, cached
+    responses for files no longer in the listing are pruned.
+
     Args:
         github_url: GitHub directory URL.
+        concurrency: Maximum number of downloads in flight at once.
+        known_shas: Blob SHA of each already ingested file, keyed by path.
+        cache: Optional response cache used to make requests conditional.
+        transport: Optional transport to send requests through, for tests.
 
     Yields:
-        LoadedDocument for each supported file found.
+        LoadedDocument for each new or changed supported file, in completion
+        order.
     """
     owner, repo, branch, path = parse_github_url(github_url)
     api_url = (
@@ -181,46 +632,125 @@ def load_github_documents(github_url: str) -> Iterator[LoadedDocument]:
 
     logger.info(f"Loading documents from GitHub: {github_url}")
 
-    response = github_api_request(api_url)
-    contents = response.json()
-
-    for item in contents:
-        if item.get("type") != "file":
-            continue
-
-        filename = item["name"]
-        doc_type = get_doc_type(filename)
-        if doc_type is None:
-            logger.debug(f"Skipping unsupported file: {filename}")
-            continue
+    async with httpx.AsyncClient(
+        headers=GITHUB_HEADERS,
+        timeout=GITHUB_TIMEOUT,
+        limits=httpx.Limits(max_connections=concurrency),
+        transport=transport,
+    ) as client:
+        response = await github_api_request_async(client, api_url, cache=cache)
+
+        known_shas = known_shas or {}
+        items: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        listed_urls = [api_url]
+        for item in response.json():
+            if item.get("type") != "file":
+                continue
+            if get_doc_type(item["name"]) is None:
+                logger.debug(f"Skipping unsupported file: {item['name']}")
+                continue
+            listed_urls.append(item["download_url"])
+            if item.get("sha") and known_shas.get(item["path"]) == item["sha"]:
+                logger.debug(f"Skipping unchanged document: {item['name']}")
+                continue
+            items.put_nowait(item)
+
+        # Bounded so downloads pause while the consumer catches up
+        results: asyncio.Queue[LoadedDocument | None] = asyncio.Queue(concurrency)
+        workers = [
+            asyncio.create_task(_github_download_worker(client, items, results, cache))
+            for _ in range(min(concurrency, items.qsize()))
+        ]
 
         try:
-            download_url = item["download_url"]
-            file_response = github_api_request(download_url)
-            raw_content = file_response.content
-            content_hash = calculate_content_hash(raw_content)
-            file_size = len(raw_content)
-
-            if doc_type == DocType.PDF:
-                logger.debug(f"Converting PDF to markdown: {filename}")
-                content = convert_pdf_from_bytes(raw_content)
-            else:
-                content = raw_content.decode("utf-8")
-
-            logger.info(f"Loaded document from GitHub: {filename} ({file_size} bytes)")
-
-            yield LoadedDocument(
-                source="github",
-                file_path=item["path"],
-                file_name=filename,
-                doc_type=doc_type,
-                content=content,
-                content_hash=content_hash,
-                file_size=file_size,
-            )
-        except Exception as e:
-            logger.warning(f"Failed to load {filename} from GitHub: {e}")
-            continue
+            remaining = len(workers)
+            while remaining:
+                document = await results.get()
+                if document is None:
+                    remaining -= 1
+                else:
+                    yield document
+            if cache:
+                cache.prune(listed_urls)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def _github_download_worker(
+    client: httpx.AsyncClient,
+    items: "asyncio.Queue[dict[str, Any]]",
+    results: "asyncio.Queue[LoadedDocument | None]",
+    cache: HttpCache | None,
+) -> None:
+    """Download files from the listing until none are left, then signal None."""
+    while not items.empty():
+        item = items.get_nowait()
+        document = await _download_github_document(client, item, cache)
+        if document is not None:
+            await results.put(document)
+    await results.put(None)
+
+
+async def _download_github_document(
+    client: httpx.AsyncClient, item: dict[str, Any], cache: HttpCache | None
+) -> LoadedDocument | None:
+    filename = item["name"]
+    doc_type = get_doc_type(filename)
+    assert doc_type is not None
+
+    try:
+        file_response = await github_api_request_async(
+            client, item["download_url"], cache=cache
+        )
+        raw_content = file_response.content
+        content_hash = calculate_content_hash(raw_content)
+        file_size = len(raw_content)
+
+        logger.info(f"Loaded document from GitHub: {filename} ({file_size} bytes)")
+
+        return LoadedDocument(
+            source="github",
+            file_path=item["path"],
+            file_name=filename,
+            doc_type=doc_type,
+            content_hash=content_hash,
+            file_size=file_size,
+            raw_content=raw_content,
+            blob_sha=item.get("sha"),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to load {filename} from GitHub: {e}")
+        return None
+
+
+def _iterate_in_background(iterator: AsyncIterator[T]) -> Iterator[T]:
+    """Drive an async iterator from synchronous code.
+
+    The iterator runs on an event loop in its own thread, so its tasks keep
+    making progress while the caller is busy with the previous item.
+    """
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="async-loader", daemon=True)
+    thread.start()
+
+    async def next_item() -> T:
+        return await anext(iterator)
+
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(next_item(), loop).result()
+            except StopAsyncIteration:
+                break
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            asyncio.run_coroutine_threadsafe(aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
 
 
 def convert_pdf_from_bytes(pdf_bytes: bytes) -> str:
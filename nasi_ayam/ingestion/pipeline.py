@@ -0,0 +1,478 @@
+"""Staged ingestion pipeline.
+
+Documents flow through four stages, each running on its own thread:
+
+    loader -> chunker -> embedder -> writer
+
+Stages are connected by bounded queues so a slow stage applies backpressure to
+the ones before it. While one document is being embedded the next can be
+converted from PDF and the previous one written to the database.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator
+from uuid import UUID
+
+import psycopg
+
+from nasi_ayam.database import (
+    DocumentRecord,
+    SemanticChunkRecord,
+    bump_corpus_generation,
+    copy_documents,
+    copy_semantic_chunks,
+    delete_documents,
+    get_cursor,
+    get_document_ids_by_path,
+    uuid7,
+)
+from nasi_ayam.ingestion.chunker import (
+    StoredSemanticChunk,
+    VectorChunk,
+    chunk_document,
+    create_vector_chunks,
+)
+from nasi_ayam.ingestion.embedder import Embedder, EmbeddingBatcher
+from nasi_ayam.ingestion.loader import LoadedDocument
+from nasi_ayam.logging import get_logger
+from nasi_ayam.vector_store import (
+    VectorChunkRecord,
+    copy_vector_chunks,
+    get_search_embedding_dimensions,
+    truncate_embedding,
+)
+
+logger = get_logger("pipeline")
+
+_DONE = object()
+
+# How long the embedder and writer wait for more documents before processing a
+# partial batch
+BATCH_LINGER_SECONDS = 0.05
+
+
+@dataclass
+class ChunkedDocument:
+    """A document split into chunks with client-generated IDs, ready to embed."""
+
+    document: LoadedDocument
+    document_id: UUID
+    semantic_chunks: list[StoredSemanticChunk]
+    vector_chunks: list[VectorChunk]
+    embeddings: list[list[float]] = field(default_factory=list)
+
+
+@dataclass
+class StageStats:
+    """Work done by a single pipeline stage."""
+
+    name: str
+    items: int = 0
+    failures: int = 0
+    busy_seconds: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Items processed per second of time spent working."""
+        if self.busy_seconds == 0:
+            return 0.0
+        return self.items / self.busy_seconds
+
+
+class IngestionPipeline:
+    """Runs loaded documents through chunking, embedding and database writes."""
+
+    def __init__(
+        self,
+        database_url: str,
+        embedder: Embedder,
+        semantic_chunk_size: int,
+        chunk_size: int,
+        overlap_size: int,
+        queue_size: int,
+        embedding_batch_size: int,
+        write_batch_size: int,
+        search_dimensions: int | None = None,
+    ) -> None:
+        self._database_url = database_url
+        self._embedder = embedder
+        self._semantic_chunk_size = semantic_chunk_size
+        self._chunk_size = chunk_size
+        self._overlap_size = overlap_size
+        self._queue_size = queue_size
+        self._batcher = EmbeddingBatcher(embedder, embedding_batch_size)
+        self._write_batch_size = write_batch_size
+        self._search_dimensions = search_dimensions
+        self._search_dimensions_checked = False
+        self.stats = [
+            StageStats("loader"),
+            StageStats("chunker"),
+            StageStats("embedder"),
+            StageStats("writer"),
+        ]
+        self.wall_seconds = 0.0
+
+    def run(self, documents: Iterable[LoadedDocument]) -> int:
+        """Ingest documents, returning the number written.
+
+        Documents that fail in any stage after loading are logged and skipped.
+        An error raised while iterating ``documents`` stops the pipeline once
+        the documents already loaded have drained, then is re-raised.
+        """
+        loaded: queue.Queue[Any] = queue.Queue(self._queue_size)
+        chunked: queue.Queue[Any] = queue.Queue(self._queue_size)
+        embedded: queue.Queue[Any] = queue.Queue(self._queue_size)
+        loader_stats, chunker_stats, embedder_stats, writer_stats = self.stats
+        errors: list[BaseException] = []
+
+        threads = [
+            threading.Thread(
+                target=self._load,
+                args=(iter(documents), loaded, loader_stats, errors),
+                name="ingest-loader",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=(self._chunk, loaded, chunked, chunker_stats),
+                name="ingest-chunker",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_embedder,
+                args=(chunked, embedded, embedder_stats),
+                name="ingest-embedder",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_writer,
+                args=(embedded, writer_stats),
+                name="ingest-writer",
+                daemon=True,
+            ),
+        ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_seconds = time.perf_counter() - started
+
+        if errors:
+            raise errors[0]
+        return writer_stats.items
+
+    def report(self) -> list[str]:
+        """Describe the throughput of each stage, one line per stage."""
+        lines = [
+            f"{stats.name}: {stats.items} document(s) in {stats.busy_seconds:.2f}s "
+            f"({stats.throughput:.2f}/s, {stats.failures} failed)"
+            for stats in self.stats
+        ]
+        lines.append(
+            f"embedding: {self._batcher.chunks} chunk(s) in "
+            f"{self._batcher.seconds:.2f}s ({self._batcher.chunks_per_second:.1f} chunks/s)"
+        )
+        lines.append(f"total wall time: {self.wall_seconds:.2f}s")
+        return lines
+
+    def _load(
+        self,
+        documents: Iterator[LoadedDocument],
+        output: "queue.Queue[Any]",
+        stats: StageStats,
+        errors: list[BaseException],
+    ) -> None:
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    document = next(documents)
+                except StopIteration:
+                    break
+                finally:
+                    stats.busy_seconds += time.perf_counter() - started
+                stats.items += 1
+                output.put(document)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            output.put(_DONE)
+
+    def _run_stage(
+        self,
+        process: Callable[[Any], Any],
+        input: "queue.Queue[Any]",
+        output: "queue.Queue[Any] | None",
+        stats: StageStats,
+    ) -> None:
+        while True:
+            item = input.get()
+            if item is _DONE:
+                break
+
+            started = time.perf_counter()
+            try:
+                result = process(item)
+                stats.items += 1
+            except Exception as e:
+                stats.failures += 1
+                logger.warning(
+                    f"Ingestion {stats.name} failed for "
+                    f"{_document_name(item)}: {e}",
+                    exc_info=True,
+                )
+                result = None
+            finally:
+                stats.busy_seconds += time.perf_counter() - started
+
+            if output is not None and result is not None:
+                output.put(result)
+
+        if output is not None:
+            output.put(_DONE)
+
+    def _chunk(self, document: LoadedDocument) -> ChunkedDocument:
+        semantic_chunks = [
+            StoredSemanticChunk(
+                content=chunk.content,
+                heading_path=chunk.heading_path,
+                start_position=chunk.start_position,
+                end_position=chunk.end_position,
+                id=uuid7(),
+            )
+            for chunk in chunk_document(
+                document.content, document.doc_type, self._semantic_chunk_size
+            )
+        ]
+        vector_chunks = create_vector_chunks(
+            document.content, self._chunk_size, self._overlap_size, semantic_chunks
+        )
+        return ChunkedDocument(
+            document=document,
+            document_id=uuid7(),
+            semantic_chunks=semantic_chunks,
+            vector_chunks=vector_chunks,
+        )
+
+    def _run_embedder(
+        self,
+        input: "queue.Queue[Any]",
+        output: "queue.Queue[Any]",
+        stats: StageStats,
+    ) -> None:
+        done = False
+        while not done:
+            batch, done = self._gather_batch(
+                input,
+                self._batcher.batch_size,
+                lambda chunked: len(chunked.vector_chunks),
+            )
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            embedded = self._embed_batch(batch, stats)
+            stats.busy_seconds += time.perf_counter() - started
+
+            for chunked in embedded:
+                output.put(chunked)
+
+        output.put(_DONE)
+
+    def _gather_batch(
+        self,
+        input: "queue.Queue[Any]",
+        limit: int,
+        size: Callable[[ChunkedDocument], int],
+    ) -> tuple[list[ChunkedDocument], bool]:
+        """Collect documents until their total ``size`` reaches ``limit``.
+
+        Blocks for the first document, then only waits briefly for more so a
+        slow upstream stage doesn't hold back the documents already gathered.
+        Returns the batch and whether the end of the stream was reached.
+        """
+        batch: list[ChunkedDocument] = []
+        total = 0
+
+        while total < limit:
+            try:
+                timeout = BATCH_LINGER_SECONDS if batch else None
+                item = input.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+            total += size(item)
+
+        return batch, False
+
+    def _embed_batch(
+        self, batch: list[ChunkedDocument], stats: StageStats
+    ) -> list[ChunkedDocument]:
+        """Embed a batch, falling back to one document at a time on failure."""
+        try:
+            embeddings = self._batcher.encode([c.vector_chunks for c in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                stats.failures += 1
+                logger.warning(
+                    f"Ingestion embedder failed for {batch[0].document.file_name}: {e}",
+                    exc_info=True,
+                )
+                return []
+            logger.warning(f"Batch embedding failed, retrying per document: {e}")
+            return [
+                embedded
+                for chunked in batch
+                for embedded in self._embed_batch([chunked], stats)
+            ]
+
+        for chunked, document_embeddings in zip(batch, embeddings):
+            chunked.embeddings = document_embeddings
+        stats.items += len(batch)
+        return batch
+
+    def _run_writer(self, input: "queue.Queue[Any]", stats: StageStats) -> None:
+        done = False
+        while not done:
+            batch, done = self._gather_batch(
+                input, self._write_batch_size, lambda chunked: 1
+            )
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            self._write_with_fallback(batch, stats)
+            stats.busy_seconds += time.perf_counter() - started
+
+    def _write_with_fallback(
+        self, batch: list[ChunkedDocument], stats: StageStats
+    ) -> None:
+        """Write a batch, falling back to one document at a time on failure."""
+        try:
+            self._write_batch(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                stats.failures += 1
+                logger.warning(
+                    f"Ingestion writer failed for {batch[0].document.file_name}: {e}",
+                    exc_info=True,
+                )
+                return
+            logger.warning(f"Batch write failed, retrying per document: {e}")
+            for chunked in batch:
+                self._write_with_fallback([chunked], stats)
+            return
+
+        stats.items += len(batch)
+
+    def _write_batch(self, batch: list[ChunkedDocument]) -> None:
+        """Replace the stored copies of a batch of documents.
+
+        Documents, semantic chunks and embedded vector chunks are written with
+        COPY in a single transaction, so the cost doesn't grow with round
+        trips per chunk and a document is never left half written.
+        """
+        with get_cursor(self._database_url) as cur:
+            if self._search_dimensions and not self._search_dimensions_checked:
+                self._check_search_dimensions(cur)
+            existing = get_document_ids_by_path(
+                cur, [(c.document.source, c.document.file_path) for c in batch]
+            )
+            delete_documents(cur, list(existing.values()))
+            bump_corpus_generation(cur)
+
+            copy_documents(
+                cur,
+                (
+                    DocumentRecord(
+                        id=chunked.document_id,
+                        source=chunked.document.source,
+                        file_path=chunked.document.file_path,
+                        file_name=chunked.document.file_name,
+                        doc_type=chunked.document.doc_type.value,
+                        content_hash=chunked.document.content_hash,
+                        file_size=chunked.document.file_size,
+                        blob_sha=chunked.document.blob_sha,
+                        mtime_ns=chunked.document.mtime_ns,
+                        inode=chunked.document.inode,
+                    )
+                    for chunked in batch
+                ),
+            )
+            copy_semantic_chunks(
+                cur,
+                (
+                    SemanticChunkRecord(
+                        id=chunk.id,
+                        document_id=chunked.document_id,
+                        content=chunk.content,
+                        heading_path=chunk.heading_path,
+                        start_position=chunk.start_position,
+                        end_position=chunk.end_position,
+                    )
+                    for chunked in batch
+                    for chunk in chunked.semantic_chunks
+                ),
+            )
+            copy_vector_chunks(
+                cur,
+                (
+                    VectorChunkRecord(
+                        id=uuid7(),
+                        document_id=chunked.document_id,
+                        source=chunked.document.source,
+                        doc_type=chunked.document.doc_type.value,
+                        content=chunk.content,
+                        start_position=chunk.start_position,
+                        end_position=chunk.end_position,
+                        semantic_chunk_ids=chunk.semantic_chunk_ids,
+                        embedding=embedding,
+                        search_embedding=(
+                            truncate_embedding(embedding, self._search_dimensions)
+                            if self._search_dimensions
+                            else None
+                        ),
+                    )
+                    for chunked in batch
+                    for chunk, embedding in zip(
+                        chunked.vector_chunks, chunked.embeddings
+                    )
+                ),
+            )
+
+        for chunked in batch:
+            doc = chunked.document
+            if (doc.source, doc.file_path) in existing:
+                logger.info(f"Re-ingested changed document: {doc.file_name}")
+            logger.info(
+                f"Ingested: {doc.file_name} ({len(chunked.semantic_chunks)} semantic, "
+                f"{len(chunked.vector_chunks)} vector chunks)"
+            )
+
+    def _check_search_dimensions(self, cur: psycopg.Cursor[dict[str, Any]]) -> None:
+        """Leave the truncated embeddings empty when the column isn't typed at
+        the configured dimensions, as a write would fail on the mismatch."""
+        indexed = get_search_embedding_dimensions(cur)
+        if indexed != self._search_dimensions:
+            logger.warning(
+                f"Truncated embeddings are not built at {self._search_dimensions} "
+                f"dimensions (found {indexed}), writing them empty until the "
+                "vector index is rebuilt with -r"
+            )
+            self._search_dimensions = None
+        self._search_dimensions_checked = True
+
+
+def _document_name(item: Any) -> str:
+    if isinstance(item, ChunkedDocument):
+        return item.document.file_name
+    if isinstance(item, LoadedDocument):
+        return item.file_name
+    return repr(item)
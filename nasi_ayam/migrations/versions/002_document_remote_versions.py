@@ -0,0 +1,24 @@
+"""Record the blob SHA of GitHub documents.
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE documents ADD COLUMN blob_sha VARCHAR(40)")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS blob_sha")
@@ -0,0 +1,32 @@
+"""Record file system metadata of local documents.
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        ALTER TABLE documents
+            ADD COLUMN mtime_ns BIGINT,
+            ADD COLUMN inode BIGINT
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        ALTER TABLE documents
+            DROP COLUMN IF EXISTS inode,
+            DROP COLUMN IF EXISTS mtime_ns
+    """)
@@ -0,0 +1,84 @@
+"""Store vector chunks in a native pgvector table with typed columns.
+
+Replaces the tables managed by LangChain's PGVector, which kept the chunk
+metadata as strings in a JSONB column. Existing embeddings are copied across
+so documents don't need to be embedded again.
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+
+    op.execute("CREATE TYPE document_source AS ENUM ('local', 'github')")
+    op.execute("CREATE TYPE document_doc_type AS ENUM ('md', 'txt', 'pdf')")
+
+    op.execute("""
+        CREATE TABLE vector_chunks (
+            id UUID PRIMARY KEY DEFAULT uuidv7(),
+            document_id UUID NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+            source document_source NOT NULL,
+            doc_type document_doc_type NOT NULL,
+            content TEXT NOT NULL,
+            start_position INTEGER NOT NULL,
+            end_position INTEGER NOT NULL,
+            semantic_chunk_ids UUID[] NOT NULL DEFAULT '{}',
+            embedding vector(768) NOT NULL
+        )
+    """)
+
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('langchain_pg_embedding') IS NOT NULL THEN
+                INSERT INTO vector_chunks (
+                    document_id, source, doc_type, content, start_position,
+                    end_position, semantic_chunk_ids, embedding
+                )
+                SELECT
+                    d.id,
+                    (e.cmetadata->>'source')::document_source,
+                    (e.cmetadata->>'doc_type')::document_doc_type,
+                    e.document,
+                    (e.cmetadata->>'start_position')::integer,
+                    (e.cmetadata->>'end_position')::integer,
+                    ARRAY(
+                        SELECT jsonb_array_elements_text(
+                            e.cmetadata->'semantic_chunk_ids'
+                        )::uuid
+                    ),
+                    e.embedding::vector(768)
+                FROM langchain_pg_embedding e
+                JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+                JOIN documents d ON d.id = (e.cmetadata->>'document_id')::uuid
+                WHERE c.name = 'document_chunks';
+
+                DROP TABLE langchain_pg_embedding;
+                DROP TABLE langchain_pg_collection;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade() -> None:
+    # The LangChain tables are recreated empty by PGVector, documents must be
+    # ingested again after downgrading
+    op.execute("DELETE FROM ingestion_log")
+    op.execute("DELETE FROM documents")
+    op.execute("DROP TABLE IF EXISTS vector_chunks")
+    op.execute("DROP TYPE IF EXISTS document_doc_type")
+    op.execute("DROP TYPE IF EXISTS document_source")
@@ -0,0 +1,31 @@
+"""Add an approximate nearest neighbour index on vector chunk embeddings.
+
+The index is built with pgvector's default HNSW parameters. Run
+``nasi-ayam -r`` to rebuild it with the parameters from the configuration.
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX idx_vector_chunks_embedding ON vector_chunks
+        USING hnsw (embedding vector_cosine_ops)
+        WITH (m = 16, ef_construction = 64)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_vector_chunks_embedding")
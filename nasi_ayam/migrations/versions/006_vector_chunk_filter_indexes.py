@@ -0,0 +1,37 @@
+"""Index the vector chunk columns used to filter searches and delete chunks.
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE INDEX idx_vector_chunks_document_id ON vector_chunks(document_id)
+    """)
+
+    op.execute("""
+        CREATE INDEX idx_vector_chunks_source_doc_type
+        ON vector_chunks(source, doc_type)
+    """)
+
+    op.execute("""
+        CREATE INDEX idx_vector_chunks_doc_type ON vector_chunks(doc_type)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_vector_chunks_doc_type")
+    op.execute("DROP INDEX IF EXISTS idx_vector_chunks_source_doc_type")
+    op.execute("DROP INDEX IF EXISTS idx_vector_chunks_document_id")
@@ -0,0 +1,38 @@
+"""Cache query embeddings across invocations.
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE query_embeddings (
+            model TEXT NOT NULL,
+            query_hash VARCHAR(64) NOT NULL,
+            embedding vector NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            used_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (model, query_hash)
+        )
+    """)
+
+    op.execute("""
+        CREATE INDEX idx_query_embeddings_used_at
+        ON query_embeddings(model, used_at DESC)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS query_embeddings")
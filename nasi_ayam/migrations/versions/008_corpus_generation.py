@@ -0,0 +1,32 @@
+"""Track a corpus generation that ingestion bumps on every write.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "008"
+down_revision: Union[str, None] = "007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE TABLE corpus_generation (
+            id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+            generation BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+    """)
+
+    op.execute("INSERT INTO corpus_generation DEFAULT VALUES")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS corpus_generation")
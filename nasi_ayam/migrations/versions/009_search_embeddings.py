@@ -0,0 +1,26 @@
+"""Add truncated Matryoshka embeddings for the first stage of vector search.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "009"
+down_revision: Union[str, None] = "008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The dimension is configurable, so the column is typed and indexed when
+    # the vector index is rebuilt
+    op.execute("ALTER TABLE vector_chunks ADD COLUMN search_embedding vector")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE vector_chunks DROP COLUMN IF EXISTS search_embedding")
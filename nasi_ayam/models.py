@@ -0,0 +1,204 @@
+"""Process-wide registry of loaded models."""
+
+import gc
+import io
+import platform
+import threading
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, TypeVar, cast
+
+from sentence_transformers import (
+    CrossEncoder,
+    SentenceTransformer,
+    export_dynamic_quantized_onnx_model,
+)
+
+from nasi_ayam.logging import get_logger
+
+logger = get_logger("models")
+
+T = TypeVar("T")
+
+ModelKey = tuple[str, str]
+
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_MODEL_CACHE_PATH = ".cache/models"
+
+_model_cache_path = DEFAULT_MODEL_CACHE_PATH
+
+
+@dataclass
+class _Entry:
+    model: Any
+    references: int = 0
+
+
+class ModelRegistry:
+    """Shares loaded models between their users and tracks who holds them.
+
+    Each ``acquire`` must be paired with a ``release``. Models stay loaded
+    when their last reference is released, so a model released by ingestion
+    is reused by search, until ``unload`` or ``unload_unused`` frees them.
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[ModelKey, _Entry] = {}
+        self._lock = threading.Lock()
+        self._load_locks: dict[ModelKey, threading.Lock] = {}
+
+    def acquire(self, key: ModelKey, load: Callable[[], T]) -> T:
+        """Get a model, loading it on first use, and take a reference to it.
+
+        Concurrent callers asking for the same model wait for a single load.
+        """
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                logger.info(f"Loading {key[0]} model: {key[1]}")
+                with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                    entry = _Entry(load())
+            with self._lock:
+                self._entries[key] = entry
+                entry.references += 1
+                return cast(T, entry.model)
+
+    def release(self, key: ModelKey) -> None:
+        """Drop a reference taken by ``acquire``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.references == 0:
+                raise ValueError(f"{key[0]} model {key[1]} is not acquired")
+            entry.references -= 1
+
+    def references(self, key: ModelKey) -> int:
+        with self._lock:
+            entry = self._entries.get(key)
+            return 0 if entry is None else entry.references
+
+    def loaded(self) -> list[ModelKey]:
+        with self._lock:
+            return list(self._entries)
+
+    def unload(self, key: ModelKey) -> bool:
+        """Free a model that nothing references.
+
+        Returns:
+            True if the model was unloaded, False if it is still referenced
+            or was not loaded.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.references > 0:
+                return False
+            del self._entries[key]
+        logger.info(f"Unloaded {key[0]} model: {key[1]}")
+        _free_memory()
+        return True
+
+    def unload_unused(self) -> list[ModelKey]:
+        """Free every model that nothing references."""
+        return [key for key in self.loaded() if self.unload(key)]
+
+
+def _free_memory() -> None:
+    gc.collect()
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def configure_models(cache_path: str) -> None:
+    """Set where quantized copies of models are stored."""
+    global _model_cache_path
+    _model_cache_path = cache_path
+
+
+def model_id(model_name: str, backend: str) -> str:
+    """Identify a model as run by an inference backend.
+
+    Quantized models produce slightly different outputs, so anything cached
+    from a model's outputs should be keyed by this rather than the name.
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(
+            f"Unknown inference backend: {backend}, "
+            f"expected one of {', '.join(INFERENCE_BACKENDS)}"
+        )
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+def _quantization_config() -> str:
+    """Pick the dynamic int8 quantization config for this CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    return "avx2"
+
+
+def _load_model(
+    model_class: Callable[..., T], model_name: str, backend: str, **kwargs: Any
+) -> T:
+    """Load a model with an inference backend.
+
+    The ``onnx-int8`` backend quantizes the ONNX export of the model on first
+    use and stores it below the model cache path for later runs.
+    """
+    model_id(model_name, backend)
+    if backend == "torch":
+        return model_class(model_name, **kwargs)
+    if backend == "onnx":
+        return model_class(model_name, backend="onnx", **kwargs)
+
+    config = _quantization_config()
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    save_dir = Path(_model_cache_path) / model_name.replace("/", "--")
+    if not (save_dir / file_name).exists():
+        logger.info(f"Quantizing {model_name} to int8 for {config}")
+        model: Any = model_class(model_name, backend="onnx", **kwargs)
+        model.save_pretrained(str(save_dir))
+        export_dynamic_quantized_onnx_model(model, config, str(save_dir))
+    return model_class(
+        str(save_dir), backend="onnx", model_kwargs={"file_name": file_name}, **kwargs
+    )
+
+
+registry = ModelRegistry()
+
+
+def sentence_transformer_key(model_name: str, backend: str = "torch") -> ModelKey:
+    return ("embedding", model_id(model_name, backend))
+
+
+def cross_encoder_key(model_name: str, backend: str = "torch") -> ModelKey:
+    return ("reranker", model_id(model_name, backend))
+
+
+def acquire_sentence_transformer(
+    model_name: str, backend: str = "torch"
+) -> SentenceTransformer:
+    """Take a reference to a shared sentence transformer."""
+    return registry.acquire(
+        sentence_transformer_key(model_name, backend),
+        lambda: _load_model(
+            SentenceTransformer, model_name, backend, trust_remote_code=True
+        ),
+    )
+
+
+def acquire_cross_encoder(model_name: str, backend: str = "torch") -> CrossEncoder:
+    """Take a reference to a shared cross-encoder."""
+    return cast(
+        CrossEncoder,
+        registry.acquire(
+            cross_encoder_key(model_name, backend),
+            lambda: _load_model(CrossEncoder, model_name, backend),
+        ),
+    )
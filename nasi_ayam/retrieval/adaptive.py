@@ -0,0 +1,49 @@
+"""Adaptive reranking decisions from the vector similarity distribution."""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class RerankPlan:
+    """Which candidates, sorted by vector similarity, are worth reranking.
+
+    Candidates before ``accepted`` are clearly in the results, those from
+    ``accepted`` up to ``boundary_end`` are too close to the cut to call and
+    are reranked, and the rest are clearly out.
+    """
+
+    accepted: int
+    boundary_end: int
+    # The ambiguous region reaches the last candidate, so candidates that
+    # weren't fetched might belong in it too
+    needs_more: bool
+
+    @property
+    def boundary(self) -> range:
+        return range(self.accepted, self.boundary_end)
+
+
+def plan_rerank(similarities: list[float], top_k: int, margin: float) -> RerankPlan:
+    """Decide which candidates need the reranker to pick the top results.
+
+    The cut sits halfway between the ``top_k``-th and the next candidate's
+    similarity. Candidates within ``margin / 2`` of it are ambiguous, so when
+    the gap at the cut is at least ``margin`` nothing needs reranking.
+
+    Args:
+        similarities: Cosine similarities of the candidates, highest first.
+        top_k: Number of results wanted.
+        margin: Similarity difference treated as decisive.
+
+    Returns:
+        The rerank plan.
+    """
+    if len(similarities) <= top_k:
+        return RerankPlan(len(similarities), len(similarities), needs_more=False)
+
+    cut = (similarities[top_k - 1] + similarities[top_k]) / 2
+    accepted = sum(1 for s in similarities if s >= cut + margin / 2)
+    boundary_end = sum(1 for s in similarities if s > cut - margin / 2)
+    return RerankPlan(
+        accepted, boundary_end, needs_more=boundary_end == len(similarities)
+    )
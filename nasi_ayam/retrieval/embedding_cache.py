@@ -0,0 +1,116 @@
+"""Two-tier cache of query embeddings."""
+
+import hashlib
+from typing import Callable
+
+import numpy as np
+import psycopg
+
+from nasi_ayam.cache import LRUCache
+from nasi_ayam.database import get_cursor, get_query_embedding, store_query_embedding
+from nasi_ayam.logging import get_logger
+
+logger = get_logger("embedding_cache")
+
+
+def normalise_query(query: str) -> str:
+    """Normalise a query so trivially different spellings share an entry."""
+    return " ".join(query.casefold().split())
+
+
+def query_hash(query: str) -> str:
+    """Hash a normalised query for use as a persistent cache key."""
+    return hashlib.sha256(normalise_query(query).encode()).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """Caches query embeddings in memory and optionally in Postgres.
+
+    Lookups check an in-process LRU first, then the ``query_embeddings``
+    table, and only encode the query when both miss. Entries are keyed by the
+    model name and the normalised query text, so switching models never
+    returns stale embeddings. Errors from the persistent tier are logged and
+    treated as misses so searching never fails because of the cache.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        memory_size: int,
+        database_url: str | None = None,
+        persistent_size: int = 0,
+    ) -> None:
+        self._model_name = model_name
+        self._memory: LRUCache[str, np.ndarray] = LRUCache(memory_size)
+        self._database_url = database_url
+        self._persistent_size = persistent_size
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @property
+    def memory(self) -> LRUCache[str, np.ndarray]:
+        return self._memory
+
+    @property
+    def _persistent(self) -> bool:
+        return self._database_url is not None and self._persistent_size > 0
+
+    def get_or_compute(
+        self, query: str, encode: Callable[[str], np.ndarray]
+    ) -> np.ndarray:
+        """Get the embedding for a query, encoding it on a cache miss.
+
+        Args:
+            query: The query text as entered.
+            encode: Computes the embedding of the query on a miss.
+
+        Returns:
+            The query embedding.
+        """
+        key = query_hash(query)
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            return embedding
+
+        embedding = self._load(key)
+        if embedding is not None:
+            self.persistent_hits += 1
+        else:
+            self.misses += 1
+            embedding = np.asarray(encode(query), dtype=np.float32)
+            self._store(key, embedding)
+
+        self._memory.put(key, embedding)
+        logger.info(f"Query embedding cache: {self.describe()}")
+        return embedding
+
+    def _load(self, key: str) -> np.ndarray | None:
+        if not self._persistent:
+            return None
+        assert self._database_url is not None
+        try:
+            with get_cursor(self._database_url) as cur:
+                embedding = get_query_embedding(cur, self._model_name, key)
+        except psycopg.Error as e:
+            logger.warning(f"Could not read query embedding cache: {e}")
+            return None
+        return None if embedding is None else np.asarray(embedding, dtype=np.float32)
+
+    def _store(self, key: str, embedding: np.ndarray) -> None:
+        if not self._persistent:
+            return
+        assert self._database_url is not None
+        try:
+            with get_cursor(self._database_url) as cur:
+                store_query_embedding(
+                    cur, self._model_name, key, embedding, self._persistent_size
+                )
+        except psycopg.Error as e:
+            logger.warning(f"Could not write query embedding cache: {e}")
+
+    def describe(self) -> str:
+        """Summarise both tiers' counters for logging."""
+        return (
+            f"memory {self._memory.describe()}; "
+            f"{self.persistent_hits} persistent hits, {self.misses} encoded"
+        )
@@ -0,0 +1,414 @@
+"""In-process vector index over the vector chunks in Postgres."""
+
+import os
+import threading
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Mapping, cast
+from uuid import UUID
+
+import numpy as np
+
+from nasi_ayam.database import get_corpus_generation, get_cursor, get_document_ids
+from nasi_ayam.logging import get_logger
+from nasi_ayam.vector_store import (
+    Embedding,
+    VectorMatch,
+    get_vector_chunk_embeddings,
+    load_vector_chunks,
+)
+
+try:
+    import hnswlib  # type: ignore[import-untyped]
+except ImportError:
+    hnswlib = None
+
+logger = get_logger("memory_index")
+
+MEMORY_INDEX_MODES = ("exact", "hnsw")
+EMBEDDINGS_FILE = "embeddings.f32"
+IDS_FILE = "ids.bin"
+
+# The embeddings file starts with this magic and the embedding dimensions,
+# followed by one float32 row per chunk
+_MAGIC = b"NAVEC001"
+_HEADER_SIZE = 16
+_ID_SIZE = 16
+
+# Rewrite the snapshot without removed chunks once they make up more than
+# this fraction of its rows, and there are at least this many of them
+COMPACT_FRACTION = 0.5
+COMPACT_MIN_ROWS = 1024
+
+
+def _normalise(embeddings: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return cast(
+        np.ndarray,
+        np.divide(embeddings, norms, out=np.zeros_like(embeddings), where=norms > 0),
+    )
+
+
+class MemoryVectorIndex:
+    """Searches vector chunks in process rather than with a Postgres query.
+
+    Every vector chunk's metadata is held in memory and the normalised
+    embeddings in a NumPy matrix, memory-mapped from an append-only snapshot
+    below ``cache_path`` with the chunk ids in a file alongside. A later run
+    reuses the rows of chunks that still exist, so it only fetches
+    embeddings of chunks written since. Only one process should keep an
+    index over a cache path.
+
+    The index follows the corpus generation bumped by ingestion. When it
+    changes, the rows of deleted documents are masked out and the chunks of
+    new documents are appended, so neither the matrix nor the snapshot is
+    rewritten. Re-ingested documents get new ids, so this covers changes
+    too. Once masked rows dominate, the snapshot is compacted. The
+    generation is checked at most every ``refresh_seconds``.
+
+    The ``exact`` mode scores every chunk with one matrix product. The
+    ``hnsw`` mode searches an hnswlib graph whose labels are snapshot rows,
+    so it follows the same changes with ``add_items`` and ``mark_deleted``.
+    Filtered searches fall back to exact scoring of the matching chunks.
+    """
+
+    def __init__(
+        self,
+        database_url: str,
+        cache_path: str,
+        mode: str = "exact",
+        refresh_seconds: float = 5.0,
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 64,
+        hnsw_ef_search: int = 40,
+    ) -> None:
+        if mode not in MEMORY_INDEX_MODES:
+            raise ValueError(
+                f"Unknown memory index mode {mode!r}, "
+                f"expected one of {', '.join(MEMORY_INDEX_MODES)}"
+            )
+        if mode == "hnsw" and hnswlib is None:
+            raise ImportError(
+                "The hnsw memory index needs hnswlib, install the hnsw extra "
+                "with `poetry install --extras hnsw`"
+            )
+        self._database_url = database_url
+        self._cache_path = Path(cache_path)
+        self._mode = mode
+        self._refresh_seconds = refresh_seconds
+        self._hnsw_m = hnsw_m
+        self._hnsw_ef_construction = hnsw_ef_construction
+        self._hnsw_ef_search = hnsw_ef_search
+        self._lock = threading.Lock()
+        self._generation: int | None = None
+        self._checked_at = 0.0
+        self._dimensions: int | None = None
+        # One entry per snapshot row, None once the chunk has been removed
+        self._chunks: list[VectorMatch | None] = []
+        self._alive = np.empty(0, dtype=bool)
+        self._live = 0
+        self._sources = np.empty(0, dtype=object)
+        self._doc_types = np.empty(0, dtype=object)
+        self._embeddings = np.empty((0, 0), dtype=np.float32)
+        self._rows_by_document: dict[UUID, list[int]] = {}
+        # Rows of the snapshot read at startup that no chunk has claimed yet
+        self._unclaimed: dict[UUID, int] = {}
+        self._ann: Any = None
+
+    def __len__(self) -> int:
+        return self._live
+
+    def refresh(self, force: bool = False) -> bool:
+        """Bring the index up to date with the database.
+
+        Args:
+            force: Check the corpus generation even if it was checked within
+                ``refresh_seconds``.
+
+        Returns:
+            True if the index changed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._generation is not None
+                and now - self._checked_at < self._refresh_seconds
+            ):
+                return False
+            self._checked_at = now
+
+            with get_cursor(self._database_url) as cur:
+                # Read before the documents, so a write in between is picked
+                # up again by the next refresh
+                generation = get_corpus_generation(cur)
+                if generation == self._generation:
+                    return False
+
+                if self._generation is None:
+                    removed: set[UUID] = set()
+                    self._open_snapshot()
+                    chunks = load_vector_chunks(cur)
+                else:
+                    document_ids = get_document_ids(cur)
+                    loaded = set(self._rows_by_document)
+                    removed = loaded - document_ids
+                    added = list(document_ids - loaded)
+                    chunks = load_vector_chunks(cur, added) if added else []
+
+                fetched = get_vector_chunk_embeddings(
+                    cur,
+                    [chunk.id for chunk in chunks if chunk.id not in self._unclaimed],
+                )
+
+            self._remove(removed)
+            self._add(chunks, fetched)
+            self._unclaimed.clear()
+            self._compact_if_sparse()
+            if self._mode == "hnsw" and self._ann is None:
+                self._build_ann()
+            self._generation = generation
+
+        logger.info(
+            f"Memory index at generation {generation}: {len(self)} chunks, "
+            f"{len(fetched)} fetched, {len(removed)} documents removed"
+        )
+        return True
+
+    def _remove(self, document_ids: set[UUID]) -> None:
+        for document_id in document_ids:
+            for row in self._rows_by_document.pop(document_id, []):
+                self._alive[row] = False
+                self._live -= 1
+                self._chunks[row] = None
+                if self._ann is not None:
+                    self._ann.mark_deleted(row)
+
+    def _add(
+        self, chunks: list[VectorMatch], fetched: Mapping[UUID, Embedding]
+    ) -> None:
+        new: list[VectorMatch] = []
+        for chunk in chunks:
+            row = self._unclaimed.pop(chunk.id, None)
+            if row is None:
+                new.append(chunk)
+            else:
+                self._set_row(row, chunk)
+        if not new:
+            return
+
+        matrix = _normalise(
+            np.asarray([fetched[chunk.id] for chunk in new], dtype=np.float32)
+        )
+        if matrix.shape[1] != self._dimensions:
+            if self._live:
+                raise ValueError(
+                    f"Embeddings have {matrix.shape[1]} dimensions, the index "
+                    f"has {self._dimensions}"
+                )
+            self._reset(matrix.shape[1])
+
+        first = len(self._chunks)
+        self._append_snapshot([chunk.id for chunk in new], matrix)
+        self._chunks.extend([None] * len(new))
+        self._alive = np.concatenate([self._alive, np.zeros(len(new), dtype=bool)])
+        self._sources = np.concatenate([self._sources, np.empty(len(new), object)])
+        self._doc_types = np.concatenate([self._doc_types, np.empty(len(new), object)])
+        for row, chunk in enumerate(new, first):
+            self._set_row(row, chunk)
+
+        if self._ann is not None:
+            if len(self._chunks) > self._ann.get_max_elements():
+                self._ann.resize_index(
+                    max(len(self._chunks), 2 * self._ann.get_max_elements())
+                )
+            self._ann.add_items(matrix, np.arange(first, first + len(new)))
+
+    def _set_row(self, row: int, chunk: VectorMatch) -> None:
+        self._chunks[row] = chunk
+        self._alive[row] = True
+        self._live += 1
+        self._sources[row] = chunk.source
+        self._doc_types[row] = chunk.doc_type
+        self._rows_by_document.setdefault(chunk.document_id, []).append(row)
+
+    def _reset(self, dimensions: int) -> None:
+        """Start an empty snapshot for embeddings of a new width."""
+        self._write_snapshot(b"", np.empty((0, dimensions), dtype=np.float32))
+        self._chunks = []
+        self._alive = np.empty(0, dtype=bool)
+        self._live = 0
+        self._sources = np.empty(0, dtype=object)
+        self._doc_types = np.empty(0, dtype=object)
+        self._rows_by_document = {}
+        self._unclaimed = {}
+        self._ann = None
+
+    def _compact_if_sparse(self) -> None:
+        dead = len(self._chunks) - len(self)
+        if dead < COMPACT_MIN_ROWS or dead <= len(self._chunks) * COMPACT_FRACTION:
+            return
+
+        rows = np.flatnonzero(self._alive)
+        chunks = [self._chunks[row] for row in rows]
+        self._write_snapshot(
+            b"".join(chunk.id.bytes for chunk in chunks if chunk is not None),
+            np.asarray(self._embeddings[rows]),
+        )
+        self._chunks = [None] * len(rows)
+        self._alive = np.zeros(len(rows), dtype=bool)
+        self._live = 0
+        self._sources = np.empty(len(rows), dtype=object)
+        self._doc_types = np.empty(len(rows), dtype=object)
+        self._rows_by_document = {}
+        for row, chunk in enumerate(chunks):
+            assert chunk is not None
+            self._set_row(row, chunk)
+        self._ann = None
+        logger.info(f"Compacted memory index snapshot, dropped {dead} rows")
+
+    def _build_ann(self) -> None:
+        if self._dimensions is None:
+            return
+        self._ann = hnswlib.Index(space="ip", dim=self._dimensions)
+        self._ann.init_index(
+            max_elements=max(1, len(self._chunks)),
+            ef_construction=self._hnsw_ef_construction,
+            M=self._hnsw_m,
+        )
+        rows = np.flatnonzero(self._alive)
+        if len(rows):
+            self._ann.add_items(np.asarray(self._embeddings[rows]), rows)
+
+    def _embeddings_path(self) -> Path:
+        return self._cache_path / EMBEDDINGS_FILE
+
+    def _ids_path(self) -> Path:
+        return self._cache_path / IDS_FILE
+
+    def _open_snapshot(self) -> None:
+        """Map the snapshot left by an earlier run, with every row unclaimed."""
+        try:
+            with open(self._embeddings_path(), "rb") as f:
+                header = f.read(_HEADER_SIZE)
+            ids = self._ids_path().read_bytes()
+            size = self._embeddings_path().stat().st_size
+        except OSError:
+            return
+        if len(header) < _HEADER_SIZE or header[:8] != _MAGIC:
+            return
+
+        dimensions = int(np.frombuffer(header[8:], dtype="<u8")[0])
+        # An interrupted append can leave a partial row at the end of a file
+        rows = min(len(ids) // _ID_SIZE, (size - _HEADER_SIZE) // (4 * dimensions))
+        self._dimensions = dimensions
+        self._map_snapshot(rows)
+        self._chunks = [None] * rows
+        self._alive = np.zeros(rows, dtype=bool)
+        self._sources = np.empty(rows, dtype=object)
+        self._doc_types = np.empty(rows, dtype=object)
+        self._unclaimed = {
+            UUID(bytes=ids[row * _ID_SIZE : (row + 1) * _ID_SIZE]): row
+            for row in range(rows)
+        }
+
+    def _append_snapshot(self, ids: list[UUID], matrix: np.ndarray) -> None:
+        rows = len(self._chunks)
+        with open(self._ids_path(), "r+b") as f:
+            f.truncate(rows * _ID_SIZE)
+            f.seek(rows * _ID_SIZE)
+            f.write(b"".join(id.bytes for id in ids))
+        with open(self._embeddings_path(), "r+b") as f:
+            end = _HEADER_SIZE + rows * matrix.shape[1] * 4
+            f.truncate(end)
+            f.seek(end)
+            f.write(np.ascontiguousarray(matrix, dtype="<f4").tobytes())
+        self._map_snapshot(rows + len(ids))
+
+    def _write_snapshot(self, ids: bytes, matrix: np.ndarray) -> None:
+        """Replace the snapshot with the given rows."""
+        self._cache_path.mkdir(parents=True, exist_ok=True)
+        header = _MAGIC + np.uint64(matrix.shape[1]).astype("<u8").tobytes()
+        self._dimensions = matrix.shape[1]
+        # Replace atomically so a crash never leaves a half written snapshot
+        for path, data in (
+            (self._ids_path(), ids),
+            (
+                self._embeddings_path(),
+                header + np.ascontiguousarray(matrix, dtype="<f4").tobytes(),
+            ),
+        ):
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_bytes(data)
+            os.replace(temporary, path)
+        self._map_snapshot(len(matrix))
+
+    def _map_snapshot(self, rows: int) -> None:
+        assert self._dimensions is not None
+        if rows == 0:
+            self._embeddings = np.empty((0, self._dimensions), dtype=np.float32)
+            return
+        self._embeddings = np.memmap(
+            self._embeddings_path(),
+            dtype="<f4",
+            mode="r",
+            offset=_HEADER_SIZE,
+            shape=(rows, self._dimensions),
+        )
+
+    def search(
+        self,
+        embedding: Embedding,
+        limit: int,
+        source: str | None = None,
+        doc_type: str | None = None,
+    ) -> list[VectorMatch]:
+        """Find the vector chunks closest to an embedding by cosine distance.
+
+        Takes the same arguments and returns the same matches as
+        ``search_vector_chunks``.
+        """
+        self.refresh()
+        if limit <= 0 or not self._live:
+            return []
+
+        query = _normalise(np.asarray(embedding, dtype=np.float32))
+        if self._mode == "hnsw" and not source and not doc_type:
+            return self._search_ann(query, limit)
+
+        mask = self._alive.copy()
+        if source:
+            mask &= self._sources == source
+        if doc_type:
+            mask &= self._doc_types == doc_type
+        rows = np.flatnonzero(mask)
+        if len(rows) == 0:
+            return []
+        if len(rows) == len(self._chunks):
+            scores = self._embeddings @ query
+        elif source or doc_type:
+            scores = self._embeddings[rows] @ query
+        else:
+            # Score every row at once rather than copying the live ones out
+            scores = (self._embeddings @ query)[rows]
+
+        count = min(limit, len(rows))
+        top = np.argpartition(-scores, count - 1)[:count]
+        top = top[np.argsort(-scores[top])]
+        return [self._match(rows[i], scores[i]) for i in top]
+
+    def _search_ann(self, query: np.ndarray, limit: int) -> list[VectorMatch]:
+        count = min(limit, len(self))
+        self._ann.set_ef(max(self._hnsw_ef_search, count))
+        labels, distances = self._ann.knn_query(query, k=count)
+        # Inner product distance on unit vectors is the cosine distance
+        return [
+            self._match(int(label), 1 - float(distance))
+            for label, distance in zip(labels[0], distances[0])
+        ]
+
+    def _match(self, row: int, score: float) -> VectorMatch:
+        chunk = self._chunks[row]
+        assert chunk is not None
+        return replace(chunk, distance=float(1 - score))
@@ -1,33 +1,62 @@
 """Vector search and filtering for document retrieval."""
 
-import io
-from contextlib import redirect_stderr, redirect_stdout
+import time
 from dataclasses import dataclass
 from typing import Any
 from uuid import UUID
 
-from langchain_postgres import PGVector
+import numpy as np
+import psycopg
 from sentence_transformers import CrossEncoder, SentenceTransformer
 
+from nasi_ayam.cache import LRUCache
 from nasi_ayam.database import (
-    get_document_by_id,
+    get_corpus_generation,
     get_cursor,
     get_semantic_chunks_by_ids,
 )
-from nasi_ayam.ingestion.embedder import (
-    COLLECTION_NAME,
-    EMBEDDING_MODEL,
-    SentenceTransformerEmbeddings,
-)
+from nasi_ayam.ingestion.embedder import EMBEDDING_MODEL
+from nasi_ayam.retrieval.adaptive import RerankPlan, plan_rerank
+from nasi_ayam.retrieval.embedding_cache import QueryEmbeddingCache, query_hash
+from nasi_ayam.retrieval.memory_index import MemoryVectorIndex
 from nasi_ayam.logging import get_logger
+from nasi_ayam.models import (
+    acquire_cross_encoder,
+    acquire_sentence_transformer,
+    cross_encoder_key,
+    model_id,
+    registry,
+    sentence_transformer_key,
+)
 from nasi_ayam.progress import ProgressCallback
+from nasi_ayam.vector_store import (
+    DEFAULT_RESCORE_FACTOR,
+    VectorMatch,
+    get_search_embedding_dimensions,
+    search_vector_chunks,
+)
 
 logger = get_logger("search")
 
+# Corpus generation, query hash, source, doc_type, top_k and initial_k
+SearchCacheKey = tuple[int, str, str | None, str | None, int, int]
+
+
+@dataclass
+class SemanticContext:
+    """A parent semantic chunk of a search result.
+
+    Only the heading path is loaded with the search result, the content is
+    fetched on demand with ``DocumentSearch.expand_context``.
+    """
+
+    id: UUID
+    heading_path: str
+
 
 @dataclass
 class SearchResult:
-    """A search result with vector chunk and parent semantic context."""
+    """A search result with vector chunk and parent semantic contexts."""
 
     content: str
     score: float
@@ -35,24 +64,79 @@ class SearchResult:
     source: str
     doc_type: str
     file_name: str
-    semantic_contexts: list[dict[str, Any]]
+    semantic_contexts: list[SemanticContext]
+    # False when adaptive reranking accepted the result on its vector score,
+    # in which case the score is the cosine similarity
+    reranked: bool = True
 
 
 class DocumentSearch:
     """Handles semantic search over the vector store with reranking."""
 
     def __init__(
-        self, database_url: str, reranker_model: str, initial_retrieval_count: int
+        self,
+        database_url: str,
+        reranker_model: str,
+        initial_retrieval_count: int,
+        hnsw_ef_search: int | None = None,
+        ivfflat_probes: int | None = None,
+        query_embedding_cache_size: int = 0,
+        query_embedding_cache_persistent_size: int = 0,
+        rerank_cache_size: int = 0,
+        search_cache_size: int = 0,
+        embedding_backend: str = "torch",
+        reranker_backend: str = "torch",
+        search_dimensions: int | None = None,
+        rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+        vector_quantization: str = "none",
+        memory_index: MemoryVectorIndex | None = None,
+        adaptive_rerank_margin: float = 0.0,
+        cascade_candidate_count: int | None = None,
+        first_pass_reranker_model: str | None = None,
     ) -> None:
         self._database_url = database_url
-        self._sqlalchemy_url = database_url.replace(
-            "postgresql://", "postgresql+psycopg://", 1
+        self._embedding_backend = embedding_backend
+        self._reranker_backend = reranker_backend
+        self._query_embeddings = QueryEmbeddingCache(
+            model_id(EMBEDDING_MODEL, embedding_backend),
+            query_embedding_cache_size,
+            database_url,
+            query_embedding_cache_persistent_size,
         )
+        self._hnsw_ef_search = hnsw_ef_search
+        self._ivfflat_probes = ivfflat_probes
+        self._search_dimensions = search_dimensions
+        self._search_dimensions_checked = False
+        self._rescore_factor = rescore_factor
+        self._vector_quantization = vector_quantization
+        # Replaces the Postgres vector search as the first stage when set
+        self._memory_index = memory_index
+        self._adaptive_rerank_margin = adaptive_rerank_margin
+        self._candidate_count = initial_retrieval_count
+        # Time spent by the reranker on the pairs it actually scored, so pairs
+        # served from the score cache don't skew the cost per pair
+        self._rerank_seconds = 0.0
+        self._reranked_pairs = 0
         self._reranker_model_name = reranker_model
+        # Candidates beyond this many are pruned before the reranker runs, by
+        # the first pass reranker when set or else by vector similarity
+        self._cascade_candidate_count = cascade_candidate_count
+        self._first_pass_reranker_model_name = first_pass_reranker_model
+        # Vector chunk ids are regenerated whenever a document is re-ingested,
+        # so scores cached for a changed document can never be hit again and
+        # simply age out
+        self._rerank_scores: LRUCache[tuple[str, str, UUID], float] = LRUCache(
+            rerank_cache_size
+        )
         self._initial_retrieval_count = initial_retrieval_count
+        # Final results keyed by corpus generation, query, filters and result
+        # counts, so ingestion invalidates them by bumping the generation
+        self._results: LRUCache[SearchCacheKey, list[SearchResult]] = LRUCache(
+            search_cache_size
+        )
         self._model: SentenceTransformer | None = None
-        self._vector_store: PGVector | None = None
         self._reranker: CrossEncoder | None = None
+        self._first_pass_reranker: CrossEncoder | None = None
         self._progress_callback: ProgressCallback | None = None
 
     def set_progress_callback(self, callback: ProgressCallback | None) -> None:
@@ -63,34 +147,55 @@ class DocumentSearch:
             self._progress_callback(stage, is_starting)
 
     @property
-    def model(self) -> SentenceTransformer:
-        if self._model is None:
-            logger.info(f"Loading embedding model: {EMBEDDING_MODEL}")
-            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
-                self._model = SentenceTransformer(
-                    EMBEDDING_MODEL, trust_remote_code=True
-                )
-        return self._model
+    def result_cache(self) -> LRUCache[SearchCacheKey, list[SearchResult]]:
+        return self._results
 
     @property
-    def vector_store(self) -> PGVector:
-        if self._vector_store is None:
-            logger.info("Initializing PGVector store for search")
-            self._vector_store = PGVector(
-                collection_name=COLLECTION_NAME,
-                connection=self._sqlalchemy_url,
-                embeddings=SentenceTransformerEmbeddings(self.model),  # type: ignore[arg-type]
+    def model(self) -> SentenceTransformer:
+        if self._model is None:
+            self._model = acquire_sentence_transformer(
+                EMBEDDING_MODEL, self._embedding_backend
             )
-        return self._vector_store
+        return self._model
 
     @property
     def reranker(self) -> CrossEncoder:
         if self._reranker is None:
-            logger.info(f"Loading reranker model: {self._reranker_model_name}")
-            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
-                self._reranker = CrossEncoder(self._reranker_model_name)
+            self._reranker = acquire_cross_encoder(
+                self._reranker_model_name, self._reranker_backend
+            )
         return self._reranker
 
+    @property
+    def first_pass_reranker(self) -> CrossEncoder:
+        if self._first_pass_reranker is None:
+            assert self._first_pass_reranker_model_name is not None
+            self._first_pass_reranker = acquire_cross_encoder(
+                self._first_pass_reranker_model_name, self._reranker_backend
+            )
+        return self._first_pass_reranker
+
+    def close(self) -> None:
+        """Release the embedding and reranker models to the model registry."""
+        if self._model is not None:
+            registry.release(
+                sentence_transformer_key(EMBEDDING_MODEL, self._embedding_backend)
+            )
+            self._model = None
+        if self._reranker is not None:
+            registry.release(
+                cross_encoder_key(self._reranker_model_name, self._reranker_backend)
+            )
+            self._reranker = None
+        if self._first_pass_reranker is not None:
+            assert self._first_pass_reranker_model_name is not None
+            registry.release(
+                cross_encoder_key(
+                    self._first_pass_reranker_model_name, self._reranker_backend
+                )
+            )
+            self._first_pass_reranker = None
+
     def search(
         self,
         query: str,
@@ -100,6 +205,10 @@ class DocumentSearch:
     ) -> list[SearchResult]:
         """Search for relevant documents using two-stage retrieval with reranking.
 
+        With a cascade candidate count, the candidates are pruned to that many
+        before reranking, so a larger initial retrieval count doesn't rerank
+        proportionally more pairs with the reranker.
+
         Args:
             query: The search query.
             top_k: Number of results to return after reranking.
@@ -109,79 +218,266 @@ class DocumentSearch:
         Returns:
             List of search results with reranker scores (higher = better).
         """
-        filter_dict: dict[str, str] = {}
-        if source:
-            filter_dict["source"] = source
-        if doc_type:
-            filter_dict["doc_type"] = doc_type
-
         initial_k = self._initial_retrieval_count
         logger.info(
             f"Searching for: {query[:50]}... "
-            f"(initial_k={initial_k}, final_k={top_k}, filters={filter_dict})"
+            f"(initial_k={initial_k}, final_k={top_k}, "
+            f"source={source}, doc_type={doc_type})"
         )
 
+        cache_key: SearchCacheKey | None = None
+        if self._results.max_size > 0:
+            with get_cursor(self._database_url) as cur:
+                generation = get_corpus_generation(cur)
+            cache_key = (
+                generation,
+                query_hash(query),
+                source,
+                doc_type,
+                top_k,
+                initial_k,
+            )
+            cached = self._results.get(cache_key)
+            logger.info(f"Search result cache: {self._results.describe()}")
+            if cached is not None:
+                self._report_progress("Answering", True)
+                return list(cached)
+
         self._report_progress("Searching", True)
-        if filter_dict:
-            results = self.vector_store.similarity_search_with_score(
-                query, k=initial_k, filter=filter_dict
+        query_embedding = self._query_embeddings.get_or_compute(
+            query, lambda text: self.model.encode(text, convert_to_numpy=True)
+        )
+        if self._adaptive_rerank_margin > 0:
+            results, plan = self._adaptive_first_stage(
+                query_embedding, top_k, source, doc_type
             )
         else:
-            results = self.vector_store.similarity_search_with_score(query, k=initial_k)
+            results = self._first_stage(query_embedding, initial_k, source, doc_type)
+            plan = RerankPlan(0, len(results), needs_more=False)
         self._report_progress("Searched", False)
 
         if not results:
             return []
 
         self._report_progress("Reranking", True)
-        pairs = [(query, doc.page_content) for doc, _ in results]
-        rerank_scores = self.reranker.predict(pairs)
-
-        scored_results = list(zip(results, rerank_scores))
-        scored_results.sort(key=lambda x: x[1], reverse=True)
+        boundary = results[plan.accepted : plan.boundary_end]
+        if self._cascade_candidate_count is not None:
+            boundary = self._prune(
+                query,
+                boundary,
+                max(self._cascade_candidate_count, top_k - plan.accepted),
+            )
+        rerank_scores = self._rerank(query, boundary) if boundary else []
+        reranked = sorted(
+            zip(boundary, rerank_scores), key=lambda x: x[1], reverse=True
+        )
         self._report_progress("Reranked", False)
 
-        all_scores_str = ", ".join(f"{score:.3f}" for _, score in scored_results)
+        all_scores_str = ", ".join(f"{score:.3f}" for _, score in reranked)
         logger.info(f"Reranked scores: [{all_scores_str}]")
+        if self._adaptive_rerank_margin > 0:
+            self._log_adaptive_rerank(plan, len(results))
 
         self._report_progress("Answering", True)
 
-        top_results = scored_results[:top_k]
+        # Candidates accepted on vector score alone keep their similarity
+        top_results = [
+            (match, 1 - match.distance, False) for match in results[: plan.accepted]
+        ] + [(match, score, True) for match, score in reranked]
+        top_results = top_results[:top_k]
+
+        search_results = [
+            SearchResult(
+                content=match.content,
+                score=float(score),
+                document_id=match.document_id,
+                source=match.source,
+                doc_type=match.doc_type,
+                file_name=match.file_name or "unknown",
+                semantic_contexts=[
+                    SemanticContext(id=id, heading_path=heading_path)
+                    for id, heading_path in zip(
+                        match.semantic_chunk_ids, match.heading_paths
+                    )
+                    if heading_path is not None
+                ],
+                reranked=was_reranked,
+            )
+            for match, score, was_reranked in top_results
+        ]
 
-        search_results: list[SearchResult] = []
-        for (doc, _), rerank_score in top_results:
-            metadata = doc.metadata
-            document_id = UUID(metadata["document_id"])
+        if cache_key is not None:
+            self._results.put(cache_key, search_results)
+        return list(search_results)
 
-            semantic_chunk_ids = [
-                UUID(id_str) for id_str in metadata.get("semantic_chunk_ids", [])
-            ]
+    def _first_stage(
+        self,
+        query_embedding: np.ndarray,
+        limit: int,
+        source: str | None,
+        doc_type: str | None,
+    ) -> list[VectorMatch]:
+        """Fetch the nearest vector chunks, closest first."""
+        if self._memory_index is not None:
+            return self._memory_index.search(query_embedding, limit, source, doc_type)
+        with get_cursor(self._database_url) as cur:
+            if self._search_dimensions and not self._search_dimensions_checked:
+                self._check_search_dimensions(cur)
+            return search_vector_chunks(
+                cur,
+                query_embedding,
+                limit,
+                source,
+                doc_type,
+                ef_search=self._hnsw_ef_search,
+                probes=self._ivfflat_probes,
+                search_dimensions=self._search_dimensions,
+                rescore_factor=self._rescore_factor,
+                quantization=self._vector_quantization,
+            )
 
-            semantic_contexts: list[dict[str, Any]] = []
-            file_name = "unknown"
+    def _check_search_dimensions(self, cur: psycopg.Cursor[dict[str, Any]]) -> None:
+        """Fall back to searching the full embeddings when the truncated ones
+        haven't been backfilled at the configured dimensions yet."""
+        indexed = get_search_embedding_dimensions(cur)
+        if indexed != self._search_dimensions:
+            logger.warning(
+                f"Truncated embeddings are not built at {self._search_dimensions} "
+                f"dimensions (found {indexed}), searching full embeddings until "
+                "the vector index is rebuilt with -r"
+            )
+            self._search_dimensions = None
+        self._search_dimensions_checked = True
 
-            with get_cursor(self._database_url) as cur:
-                if semantic_chunk_ids:
-                    semantic_contexts = get_semantic_chunks_by_ids(
-                        cur, semantic_chunk_ids
-                    )
-                document = get_document_by_id(cur, document_id)
-                if document:
-                    file_name = document["file_name"]
-
-            search_results.append(
-                SearchResult(
-                    content=doc.page_content,
-                    score=float(rerank_score),
-                    document_id=document_id,
-                    source=metadata["source"],
-                    doc_type=metadata["doc_type"],
-                    file_name=file_name,
-                    semantic_contexts=semantic_contexts,
-                )
+    def _adaptive_first_stage(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        source: str | None,
+        doc_type: str | None,
+    ) -> tuple[list[VectorMatch], RerankPlan]:
+        """Fetch candidates and plan which of them to rerank.
+
+        The candidate count grows while the ambiguous region around the top_k
+        cut runs past the last candidate, and the count used for the next
+        search shrinks when the region ends well before it.
+        """
+        limit = max(self._candidate_count, top_k + 1)
+        max_limit = max(self._initial_retrieval_count * 4, top_k + 1)
+        while True:
+            results = self._first_stage(query_embedding, limit, source, doc_type)
+            plan = plan_rerank(
+                [1 - match.distance for match in results],
+                top_k,
+                self._adaptive_rerank_margin,
+            )
+            if not plan.needs_more or len(results) < limit or limit >= max_limit:
+                break
+            limit = min(limit * 2, max_limit)
+            logger.info(f"Ambiguous results past the last candidate, fetching {limit}")
+
+        min_limit = max(self._initial_retrieval_count // 2, top_k + 1)
+        if plan.boundary_end <= limit // 2:
+            limit = max(min_limit, limit * 3 // 4)
+        self._candidate_count = limit
+        return results, plan
+
+    def _log_adaptive_rerank(self, plan: RerankPlan, candidates: int) -> None:
+        """Log how many candidates adaptive reranking kept from the reranker,
+        with the time that saved once the reranker's cost has been measured."""
+        skipped = candidates - len(plan.boundary)
+        message = (
+            f"Adaptive rerank: {plan.accepted} accepted by vector score, "
+            f"{len(plan.boundary)} ambiguous, {skipped}/{candidates} candidates "
+            "skipped the reranker"
+        )
+        if self._reranked_pairs:
+            seconds_per_pair = self._rerank_seconds / self._reranked_pairs
+            message += (
+                f", an estimated {skipped * seconds_per_pair * 1000:.1f}ms saved "
+                f"at {seconds_per_pair * 1000:.2f}ms per pair over "
+                f"{self._reranked_pairs} measured pairs"
+            )
+        logger.info(message)
+
+    def _prune(
+        self, query: str, matches: list[VectorMatch], count: int
+    ) -> list[VectorMatch]:
+        """Cut the candidates down to ``count`` before the reranker sees them.
+
+        The first pass reranker orders the candidates when it is configured,
+        otherwise they keep their vector similarity order.
+        """
+        if len(matches) <= count:
+            return matches
+        if self._first_pass_reranker_model_name is None:
+            pruned = matches[:count]
+        else:
+            scores = self._rerank(query, matches, first_pass=True)
+            ranked = sorted(zip(matches, scores), key=lambda x: x[1], reverse=True)
+            pruned = [match for match, _ in ranked[:count]]
+        logger.info(
+            f"Cascade: pruned {len(matches)} candidates to {count} by "
+            f"{self._first_pass_reranker_model_name or 'vector similarity'}"
+        )
+        return pruned
+
+    def _rerank(
+        self, query: str, matches: list[VectorMatch], first_pass: bool = False
+    ) -> list[float]:
+        """Score matches against the query, only running the cross-encoder
+        over pairs that have not been scored before.
+
+        Args:
+            query: The search query.
+            matches: The candidates to score.
+            first_pass: Score with the first pass reranker of the cascade
+                rather than the reranker.
+        """
+        model_name = (
+            self._first_pass_reranker_model_name
+            if first_pass
+            else self._reranker_model_name
+        )
+        assert model_name is not None
+        key_prefix = (
+            model_id(model_name, self._reranker_backend),
+            query_hash(query),
+        )
+        scores = [self._rerank_scores.get((*key_prefix, m.id)) for m in matches]
+        uncached = [i for i, score in enumerate(scores) if score is None]
+
+        if uncached:
+            reranker = self.first_pass_reranker if first_pass else self.reranker
+            started = time.perf_counter()
+            predicted = reranker.predict(
+                [(query, matches[i].content) for i in uncached]
             )
+            if not first_pass:
+                self._rerank_seconds += time.perf_counter() - started
+                self._reranked_pairs += len(uncached)
+            for i, score in zip(uncached, predicted):
+                scores[i] = float(score)
+                self._rerank_scores.put((*key_prefix, matches[i].id), float(score))
+
+        logger.info(
+            f"Reranked {len(uncached)}/{len(matches)} pairs with {model_name}, "
+            f"score cache: {self._rerank_scores.describe()}"
+        )
+        return [score for score in scores if score is not None]
+
+    def expand_context(self, context_id: UUID) -> dict[str, Any] | None:
+        """Fetch the full semantic chunk behind a search result's context.
 
-        return search_results
+        Args:
+            context_id: The ID of a ``SemanticContext``.
+
+        Returns:
+            The semantic chunk row, or None if it no longer exists.
+        """
+        with get_cursor(self._database_url) as cur:
+            rows = get_semantic_chunks_by_ids(cur, [context_id])
+        return rows[0] if rows else None
 
     def refine_search(
         self,
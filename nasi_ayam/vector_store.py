@@ -0,0 +1,516 @@
+"""Vector chunk storage and similarity search using pgvector directly."""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Sequence
+from uuid import UUID
+
+import numpy as np
+import psycopg
+from psycopg import sql
+
+VECTOR_CHUNK_COLUMNS = [
+    "id",
+    "document_id",
+    "source",
+    "doc_type",
+    "content",
+    "start_position",
+    "end_position",
+    "semantic_chunk_ids",
+    "embedding",
+    "search_embedding",
+]
+
+# Binary COPY sends each value in the column's wire format. An enum's binary
+# format is its label, so the enum columns are sent as text.
+VECTOR_CHUNK_COPY_TYPES = [
+    "uuid",
+    "uuid",
+    "text",
+    "text",
+    "text",
+    "int4",
+    "int4",
+    "uuid[]",
+    "vector",
+    "vector",
+]
+
+Embedding = Sequence[float] | np.ndarray
+
+# Labels of the document_source and document_doc_type enums
+DOCUMENT_SOURCES = ("local", "github")
+DOCUMENT_DOC_TYPES = ("md", "txt", "pdf")
+
+VECTOR_INDEX_NAME = "idx_vector_chunks_embedding"
+VECTOR_INDEX_TYPES = ("hnsw", "ivfflat")
+DEFAULT_RESCORE_FACTOR = 4
+# Largest hnsw.ef_search pgvector accepts
+MAX_EF_SEARCH = 1000
+
+# How the first stage of a search compares vectors: at full precision, as
+# half precision floats, or as binary codes by Hamming distance
+VECTOR_QUANTIZATIONS = ("none", "halfvec", "bit")
+_OPERATOR_CLASSES = {
+    "none": "vector_cosine_ops",
+    "halfvec": "halfvec_cosine_ops",
+    "bit": "bit_hamming_ops",
+}
+_DISTANCE_OPERATORS = {"none": "<=>", "halfvec": "<=>", "bit": "<~>"}
+
+# Heading paths of the semantic chunks of vector chunk ``m``, lined up with
+# its semantic_chunk_ids
+_HEADING_PATHS = sql.SQL("""
+    ARRAY(
+        SELECT s.heading_path
+        FROM unnest(m.semantic_chunk_ids) WITH ORDINALITY AS u(id, position)
+        LEFT JOIN semantic_chunks s ON s.id = u.id
+        ORDER BY u.position
+    )
+""")
+
+
+@dataclass
+class VectorChunkRecord:
+    """A row of the vector_chunks table, written by ``copy_vector_chunks``."""
+
+    id: UUID
+    document_id: UUID
+    source: str
+    doc_type: str
+    content: str
+    start_position: int
+    end_position: int
+    semantic_chunk_ids: list[UUID]
+    embedding: Embedding
+    search_embedding: Embedding | None = None
+
+
+@dataclass
+class VectorMatch:
+    """A vector chunk returned by a similarity search."""
+
+    id: UUID
+    document_id: UUID
+    source: str
+    doc_type: str
+    content: str
+    start_position: int
+    end_position: int
+    semantic_chunk_ids: list[UUID]
+    distance: float
+    file_name: str | None = None
+    heading_paths: list[str | None] = field(default_factory=list)
+
+
+def truncate_embedding(embedding: Embedding, dimensions: int) -> np.ndarray:
+    """Shorten a Matryoshka embedding to its leading dimensions.
+
+    Follows nomic-embed's recipe: layer norm over the full embedding, then
+    truncate and normalise to unit length.
+    """
+    if dimensions < 1:
+        raise ValueError(f"Cannot truncate an embedding to {dimensions} dimensions")
+    full = np.asarray(embedding, dtype=np.float32)
+    truncated = (full - full.mean())[:dimensions]
+    norm = np.linalg.norm(truncated)
+    return truncated / norm if norm > 0 else truncated
+
+
+def _quantize(
+    expression: sql.Composable, dimensions: int, quantization: str
+) -> sql.Composable:
+    """Convert a vector expression to the type compared by the first stage.
+
+    The same expression is used in the index definition and in searches, so
+    the planner can match them.
+    """
+    if quantization == "halfvec":
+        return sql.SQL("({}::halfvec({}))").format(expression, sql.Literal(dimensions))
+    if quantization == "bit":
+        return sql.SQL("(binary_quantize({})::bit({}))").format(
+            expression, sql.Literal(dimensions)
+        )
+    return expression
+
+
+def _check_quantization(quantization: str) -> None:
+    if quantization not in VECTOR_QUANTIZATIONS:
+        raise ValueError(
+            f"Unknown vector quantization {quantization!r}, "
+            f"expected one of {', '.join(VECTOR_QUANTIZATIONS)}"
+        )
+
+
+def copy_vector_chunks(
+    cur: psycopg.Cursor[dict[str, Any]], records: Iterable[VectorChunkRecord]
+) -> int:
+    """Insert vector chunks with a single binary COPY and return the count.
+
+    The connection must have the pgvector types registered, which pooled
+    connections from ``get_pool`` do.
+    """
+    statement = sql.SQL(
+        "COPY vector_chunks ({}) FROM STDIN WITH (FORMAT BINARY)"
+    ).format(sql.SQL(", ").join(map(sql.Identifier, VECTOR_CHUNK_COLUMNS)))
+    count = 0
+    with cur.copy(statement) as copy:
+        copy.set_types(VECTOR_CHUNK_COPY_TYPES)
+        for record in records:
+            copy.write_row(
+                (
+                    record.id,
+                    record.document_id,
+                    record.source,
+                    record.doc_type,
+                    record.content,
+                    record.start_position,
+                    record.end_position,
+                    record.semantic_chunk_ids,
+                    np.asarray(record.embedding, dtype=np.float32),
+                    (
+                        None
+                        if record.search_embedding is None
+                        else np.asarray(record.search_embedding, dtype=np.float32)
+                    ),
+                )
+            )
+            count += 1
+    return count
+
+
+def search_vector_chunks(
+    cur: psycopg.Cursor[dict[str, Any]],
+    embedding: Embedding,
+    limit: int,
+    source: str | None = None,
+    doc_type: str | None = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    search_dimensions: int | None = None,
+    rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+    quantization: str = "none",
+) -> list[VectorMatch]:
+    """Find the vector chunks closest to an embedding by cosine distance.
+
+    With ``search_dimensions`` or a ``quantization`` the index is scanned
+    with truncated ``search_embedding`` vectors and/or quantized vectors for
+    ``limit * rescore_factor`` candidates, which are then rescored against
+    the full precision embedding in the same query.
+
+    The name of each chunk's document and the heading paths of its semantic
+    chunks are fetched in the same query. ``heading_paths`` lines up with
+    ``semantic_chunk_ids``, holding None for a semantic chunk that no longer
+    exists.
+
+    Args:
+        cur: Database cursor.
+        embedding: The query embedding.
+        limit: Maximum number of chunks to return.
+        source: Optional filter by source (local/github).
+        doc_type: Optional filter by document type (md/txt/pdf).
+        ef_search: Candidate list size for an HNSW index scan, raised to the
+            number of candidates up to ``MAX_EF_SEARCH``. Beyond that the scan
+            continues iteratively.
+        probes: Number of lists visited by an IVFFlat index scan.
+        search_dimensions: Dimensions of the truncated first stage embeddings,
+            None scans the full embeddings.
+        rescore_factor: Candidates fetched per result for rescoring.
+        quantization: How the first stage compares vectors, one of
+            ``VECTOR_QUANTIZATIONS``.
+
+    Returns:
+        Matching chunks, closest first. Filtering by an unknown source or
+        document type matches nothing.
+    """
+    _check_quantization(quantization)
+    if (source and source not in DOCUMENT_SOURCES) or (
+        doc_type and doc_type not in DOCUMENT_DOC_TYPES
+    ):
+        # Casting the filter to the enum type would fail the whole query
+        return []
+    two_phase = bool(search_dimensions) or quantization != "none"
+    candidates = limit * rescore_factor if two_phase else limit
+    if ef_search is not None:
+        # HNSW returns at most ef_search candidates
+        _set_local(
+            cur, "hnsw.ef_search", min(max(ef_search, candidates), MAX_EF_SEARCH)
+        )
+    if probes is not None:
+        _set_local(cur, "ivfflat.probes", probes)
+    if source or doc_type or candidates > MAX_EF_SEARCH:
+        # Keep scanning the index when filters discard the nearest candidates,
+        # or more candidates are wanted than ef_search allows, rather than
+        # returning fewer than ``limit`` rows
+        _set_local(cur, "hnsw.iterative_scan", "relaxed_order")
+        _set_local(cur, "ivfflat.iterative_scan", "relaxed_order")
+
+    conditions: list[sql.Composable] = []
+    params: dict[str, Any] = {
+        "embedding": np.asarray(embedding, dtype=np.float32),
+        "limit": limit,
+    }
+    if source:
+        conditions.append(sql.SQL("source = %(source)s::document_source"))
+        params["source"] = source
+    if doc_type:
+        conditions.append(sql.SQL("doc_type = %(doc_type)s::document_doc_type"))
+        params["doc_type"] = doc_type
+
+    where = (
+        sql.SQL("WHERE ") + sql.SQL(" AND ").join(conditions)
+        if conditions
+        else sql.SQL("")
+    )
+    columns = sql.SQL("""
+        v.id, v.document_id, v.source::text AS source,
+        v.doc_type::text AS doc_type, v.content, v.start_position,
+        v.end_position, v.semantic_chunk_ids,
+        v.embedding <=> %(embedding)s AS distance
+    """)
+    if two_phase:
+        if search_dimensions:
+            column = sql.SQL("search_embedding")
+            params["search_embedding"] = truncate_embedding(
+                embedding, search_dimensions
+            )
+        else:
+            column = sql.SQL("embedding")
+            params["search_embedding"] = params["embedding"]
+        dimensions = len(params["search_embedding"])
+        params["candidates"] = candidates
+        matches = sql.SQL("""
+            SELECT {columns}
+            FROM (
+                SELECT id FROM vector_chunks
+                {where}
+                ORDER BY {column} {operator} {query}
+                LIMIT %(candidates)s
+            ) AS c
+            JOIN vector_chunks v ON v.id = c.id
+            ORDER BY distance
+            LIMIT %(limit)s
+        """).format(
+            columns=columns,
+            where=where,
+            column=_quantize(column, dimensions, quantization),
+            operator=sql.SQL(_DISTANCE_OPERATORS[quantization]),
+            query=_quantize(sql.SQL("%(search_embedding)s"), dimensions, quantization),
+        )
+    else:
+        matches = sql.SQL("""
+            SELECT {columns}
+            FROM vector_chunks v
+            {where}
+            ORDER BY v.embedding <=> %(embedding)s
+            LIMIT %(limit)s
+        """).format(columns=columns, where=where)
+
+    cur.execute(
+        sql.SQL("""
+            SELECT m.*, d.file_name, {heading_paths} AS heading_paths
+            FROM ({matches}) AS m
+            LEFT JOIN documents d ON d.id = m.document_id
+            ORDER BY m.distance
+            """).format(heading_paths=_HEADING_PATHS, matches=matches),
+        params,
+    )
+    return [VectorMatch(**row) for row in cur.fetchall()]
+
+
+def load_vector_chunks(
+    cur: psycopg.Cursor[dict[str, Any]], document_ids: list[UUID] | None = None
+) -> list[VectorMatch]:
+    """Load vector chunks with the same metadata as ``search_vector_chunks``.
+
+    Args:
+        cur: Database cursor.
+        document_ids: Only load the chunks of these documents, None loads
+            every chunk.
+
+    Returns:
+        The chunks, ordered by document, each with a distance of 0.
+    """
+    where = sql.SQL("")
+    params: dict[str, Any] = {}
+    if document_ids is not None:
+        where = sql.SQL("WHERE m.document_id = ANY(%(document_ids)s)")
+        params["document_ids"] = document_ids
+    cur.execute(
+        sql.SQL("""
+            SELECT m.id, m.document_id, m.source::text AS source,
+                m.doc_type::text AS doc_type, m.content, m.start_position,
+                m.end_position, m.semantic_chunk_ids, 0.0::float8 AS distance,
+                d.file_name, {heading_paths} AS heading_paths
+            FROM vector_chunks m
+            LEFT JOIN documents d ON d.id = m.document_id
+            {where}
+            ORDER BY m.document_id, m.start_position
+            """).format(heading_paths=_HEADING_PATHS, where=where),
+        params,
+    )
+    return [VectorMatch(**row) for row in cur.fetchall()]
+
+
+def get_vector_chunk_embeddings(
+    cur: psycopg.Cursor[dict[str, Any]], chunk_ids: list[UUID]
+) -> dict[UUID, np.ndarray]:
+    """Get the embeddings of vector chunks by their IDs."""
+    if not chunk_ids:
+        return {}
+    cur.execute(
+        "SELECT id, embedding FROM vector_chunks WHERE id = ANY(%s)", (chunk_ids,)
+    )
+    return {row["id"]: row["embedding"] for row in cur.fetchall()}
+
+
+def _set_local(cur: psycopg.Cursor[dict[str, Any]], name: str, value: Any) -> None:
+    """Set a setting for the rest of the current transaction."""
+    cur.execute("SELECT set_config(%s, %s, true)", (name, str(value)))
+
+
+def default_ivfflat_lists(row_count: int) -> int:
+    """Choose the number of IVFFlat lists recommended by pgvector for a table."""
+    if row_count > 1_000_000:
+        return max(1, int(math.sqrt(row_count)))
+    return max(1, row_count // 1000)
+
+
+def rebuild_vector_index(
+    cur: psycopg.Cursor[dict[str, Any]],
+    index_type: str,
+    hnsw_m: int,
+    hnsw_ef_construction: int,
+    ivfflat_lists: int = 0,
+    search_dimensions: int | None = None,
+    quantization: str = "none",
+) -> None:
+    """Drop and recreate the approximate nearest neighbour index.
+
+    IVFFlat clusters are computed from the rows present when the index is
+    built, so it should be rebuilt after large ingests. Dropping the index and
+    retyping ``search_embedding`` take an ACCESS EXCLUSIVE lock on the table,
+    so searches as well as writes wait until the transaction commits.
+
+    With ``search_dimensions`` the ``search_embedding`` column is retyped to
+    that many dimensions, backfilled from the full embeddings and indexed
+    instead of ``embedding``. Without it the column is cleared and left
+    untyped. With a ``quantization`` the index is built over halfvec or
+    binary codes of the indexed column, which keeps the index small while
+    the full precision column is kept for rescoring.
+
+    Args:
+        cur: Database cursor.
+        index_type: Either "hnsw" or "ivfflat".
+        hnsw_m: Maximum connections per HNSW graph node.
+        hnsw_ef_construction: Candidate list size used while building HNSW.
+        ivfflat_lists: Number of IVFFlat lists, 0 picks one from the row count.
+        search_dimensions: Dimensions of the truncated first stage embeddings.
+        quantization: How the first stage compares vectors, one of
+            ``VECTOR_QUANTIZATIONS``.
+    """
+    _check_quantization(quantization)
+    column: sql.Composable = sql.SQL(
+        "search_embedding" if search_dimensions else "embedding"
+    )
+    if quantization != "none":
+        column = _quantize(
+            column, search_dimensions or _embedding_dimensions(cur), quantization
+        )
+    column = column + sql.SQL(" " + _OPERATOR_CLASSES[quantization])
+
+    if index_type == "hnsw":
+        method = sql.SQL("hnsw ({}) WITH (m = {}, ef_construction = {})").format(
+            column, sql.Literal(hnsw_m), sql.Literal(hnsw_ef_construction)
+        )
+    elif index_type == "ivfflat":
+        if ivfflat_lists <= 0:
+            cur.execute("SELECT count(*) AS count FROM vector_chunks")
+            row = cur.fetchone()
+            ivfflat_lists = default_ivfflat_lists(row["count"] if row else 0)
+        method = sql.SQL("ivfflat ({}) WITH (lists = {})").format(
+            column, sql.Literal(ivfflat_lists)
+        )
+    else:
+        raise ValueError(
+            f"Unknown vector index type {index_type!r}, "
+            f"expected one of {', '.join(VECTOR_INDEX_TYPES)}"
+        )
+
+    index = sql.Identifier(VECTOR_INDEX_NAME)
+    cur.execute(sql.SQL("DROP INDEX IF EXISTS {}").format(index))
+    _retype_search_embeddings(cur, search_dimensions)
+    cur.execute(
+        sql.SQL("CREATE INDEX {} ON vector_chunks USING {}").format(index, method)
+    )
+
+
+def _retype_search_embeddings(
+    cur: psycopg.Cursor[dict[str, Any]], search_dimensions: int | None
+) -> None:
+    """Resize the truncated embedding column and backfill it in SQL with the
+    same layer norm, truncate and normalise steps as ``truncate_embedding``,
+    or clear it and drop its dimensions when the first stage uses the full
+    embeddings, so a later search at any dimensions sees it isn't built."""
+    if not search_dimensions:
+        cur.execute(
+            "ALTER TABLE vector_chunks "
+            "ALTER COLUMN search_embedding TYPE vector USING NULL"
+        )
+        return
+
+    if search_dimensions < 1:
+        raise ValueError(
+            f"Cannot truncate embeddings to {search_dimensions} dimensions"
+        )
+    dimensions = sql.Literal(search_dimensions)
+    cur.execute(
+        sql.SQL(
+            "ALTER TABLE vector_chunks "
+            "ALTER COLUMN search_embedding TYPE vector({}) USING NULL"
+        ).format(dimensions)
+    )
+    cur.execute(sql.SQL("""
+            UPDATE vector_chunks SET search_embedding = l2_normalize(
+                subvector(embedding, 1, {dimensions}) - array_fill(
+                    (SELECT avg(x) FROM unnest(embedding::real[]) AS x)::real,
+                    ARRAY[{dimensions}]
+                )::vector
+            )
+        """).format(dimensions=dimensions))
+
+
+def _column_dimensions(cur: psycopg.Cursor[dict[str, Any]], column: str) -> int | None:
+    """Read the declared dimensions of a vector_chunks vector column."""
+    cur.execute(
+        """
+        SELECT atttypmod AS dimensions FROM pg_attribute
+        WHERE attrelid = 'vector_chunks'::regclass AND attname = %s
+        """,
+        (column,),
+    )
+    row = cur.fetchone()
+    if row is None or row["dimensions"] <= 0:
+        return None
+    return int(row["dimensions"])
+
+
+def _embedding_dimensions(cur: psycopg.Cursor[dict[str, Any]]) -> int:
+    """Read the declared dimensions of the embedding column."""
+    dimensions = _column_dimensions(cur, "embedding")
+    if dimensions is None:
+        raise ValueError("The vector_chunks embedding column has no dimensions")
+    return dimensions
+
+
+def get_search_embedding_dimensions(
+    cur: psycopg.Cursor[dict[str, Any]],
+) -> int | None:
+    """Read the dimensions the truncated embeddings were last rebuilt with.
+
+    ``rebuild_vector_index`` types the ``search_embedding`` column and
+    backfills it in one transaction, so this is None until an index has been
+    rebuilt with ``search_dimensions``.
+    """
+    return _column_dimensions(cur, "search_embedding")
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""Compare the accuracy and latency of the model inference backends.
+
+Chunks the markdown and text files in the local example data the same way
+ingestion does, then for each backend (torch, onnx and onnx-int8) times
+embedding the chunks and the suggested prompts, and scoring the top
+candidates of each prompt with the reranker. Accuracy is measured against
+the torch backend:
+
+- embedding similarity: cosine similarity between each chunk's embedding
+  and its torch embedding
+- recall@k: the fraction of the torch top k chunks for each prompt that the
+  backend also retrieves, both against chunks embedded by the same backend
+  and against torch embedded chunks, as stored by an existing database
+- rerank agreement: the Spearman correlation of reranker scores with torch
+  and the overlap of the reranked top k
+
+Nothing is written to the database. The ONNX backends need the ``onnx``
+extra, ``poetry install --extras onnx``:
+
+    python scripts/compare_inference_backends.py --backends torch onnx onnx-int8
+"""
+
+import argparse
+import re
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from nasi_ayam.ingestion.chunker import (
+    DocType,
+    StoredSemanticChunk,
+    chunk_document,
+    create_vector_chunks,
+)
+from nasi_ayam.ingestion.embedder import EMBEDDING_MODEL
+from nasi_ayam.models import (
+    INFERENCE_BACKENDS,
+    acquire_cross_encoder,
+    acquire_sentence_transformer,
+    configure_models,
+)
+
+DEFAULT_RERANKER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+PROMPT = re.compile(r"^\d+\.\s+(.*?)(?:\s+\(tests .*\))?$")
+
+
+def load_chunks(directory, chunk_size, overlap_size, semantic_chunk_size):
+    chunks = []
+    for path in sorted(Path(directory).iterdir()):
+        doc_type = {".md": DocType.MARKDOWN, ".txt": DocType.TEXT}.get(path.suffix)
+        if doc_type is None:
+            continue
+        content = path.read_text()
+        semantic_chunks = [
+            StoredSemanticChunk(
+                id=uuid.uuid4(),
+                content=chunk.content,
+                heading_path=chunk.heading_path,
+                start_position=chunk.start_position,
+                end_position=chunk.end_position,
+            )
+            for chunk in chunk_document(content, doc_type, semantic_chunk_size)
+        ]
+        chunks.extend(
+            chunk.content
+            for chunk in create_vector_chunks(
+                content, chunk_size, overlap_size, semantic_chunks
+            )
+        )
+    return chunks
+
+
+def load_prompts(path):
+    prompts = []
+    for line in Path(path).read_text().splitlines():
+        match = PROMPT.match(line.strip())
+        if match:
+            prompts.append(match.group(1))
+    return prompts
+
+
+def normalise(embeddings):
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def top_k(query_embeddings, chunk_embeddings, k):
+    scores = normalise(query_embeddings) @ normalise(chunk_embeddings).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(expected, actual):
+    return np.mean([len(set(e) & set(a)) / len(e) for e, a in zip(expected, actual)])
+
+
+def spearman(a, b):
+    rank_a = np.argsort(np.argsort(a))
+    rank_b = np.argsort(np.argsort(b))
+    if len(a) < 2:
+        return 1.0
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def run_backend(backend, chunks, prompts, args):
+    model, load_seconds = timed(
+        lambda: acquire_sentence_transformer(EMBEDDING_MODEL, backend)
+    )
+    reranker, rerank_load_seconds = timed(
+        lambda: acquire_cross_encoder(args.reranker, backend)
+    )
+
+    # Warm up so one-off initialisation isn't counted
+    model.encode(chunks[:2], convert_to_numpy=True)
+    reranker.predict([(prompts[0], chunks[0])])
+
+    chunk_embeddings, chunk_seconds = timed(
+        lambda: model.encode(chunks, batch_size=args.batch_size, convert_to_numpy=True)
+    )
+    query_embeddings, query_seconds = timed(
+        lambda: np.stack([model.encode(p, convert_to_numpy=True) for p in prompts])
+    )
+    return {
+        "load_seconds": load_seconds + rerank_load_seconds,
+        "chunk_embeddings": chunk_embeddings,
+        "chunk_ms": chunk_seconds * 1000 / len(chunks),
+        "query_embeddings": query_embeddings,
+        "query_ms": query_seconds * 1000 / len(prompts),
+        "reranker": reranker,
+    }
+
+
+def rerank(reranker, prompts, chunks, candidates):
+    scores = []
+    started = time.perf_counter()
+    for prompt, indexes in zip(prompts, candidates):
+        scores.append(
+            np.asarray(reranker.predict([(prompt, chunks[i]) for i in indexes]))
+        )
+    return scores, (time.perf_counter() - started) * 1000 / len(prompts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backends", nargs="+", choices=INFERENCE_BACKENDS, default=INFERENCE_BACKENDS
+    )
+    parser.add_argument("--data", default="example-data/local")
+    parser.add_argument("--prompts", default="example-data/suggested-prompts.md")
+    parser.add_argument("--reranker", default=DEFAULT_RERANKER)
+    parser.add_argument("--model-cache-path", default=".cache/models")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--overlap-size", type=int, default=200)
+    parser.add_argument("--semantic-chunk-size", type=int, default=8000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--initial-k", type=int, default=10)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    configure_models(args.model_cache_path)
+    chunks = load_chunks(
+        args.data, args.chunk_size, args.overlap_size, args.semantic_chunk_size
+    )
+    prompts = load_prompts(args.prompts)
+    print(f"{len(chunks)} chunks, {len(prompts)} prompts")
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    results = {}
+    for backend in backends:
+        print(f"\nRunning {backend}")
+        results[backend] = run_backend(backend, chunks, prompts, args)
+
+    baseline = results["torch"]
+    candidates = top_k(
+        baseline["query_embeddings"], baseline["chunk_embeddings"], args.initial_k
+    )
+    baseline_scores, _ = rerank(baseline["reranker"], prompts, chunks, candidates)
+
+    print(
+        f"\n{'backend':<10} {'load s':>7} {'chunk ms':>9} {'query ms':>9} "
+        f"{'rerank ms':>10} {'cosine':>7} {'recall':>7} {'mixed':>7} "
+        f"{'spearman':>9} {'top k':>6}"
+    )
+    for backend in backends:
+        result = results[backend]
+        similarity = np.sum(
+            normalise(result["chunk_embeddings"])
+            * normalise(baseline["chunk_embeddings"]),
+            axis=1,
+        )
+        own_recall = recall(
+            candidates,
+            top_k(
+                result["query_embeddings"], result["chunk_embeddings"], args.initial_k
+            ),
+        )
+        mixed_recall = recall(
+            candidates,
+            top_k(
+                result["query_embeddings"],
+                baseline["chunk_embeddings"],
+                args.initial_k,
+            ),
+        )
+        scores, rerank_ms = rerank(result["reranker"], prompts, chunks, candidates)
+        correlation = np.mean([spearman(a, b) for a, b in zip(baseline_scores, scores)])
+        top_overlap = recall(
+            [np.argsort(-s)[: args.top_k] for s in baseline_scores],
+            [np.argsort(-s)[: args.top_k] for s in scores],
+        )
+        print(
+            f"{backend:<10} {result['load_seconds']:>7.1f} "
+            f"{result['chunk_ms']:>9.2f} {result['query_ms']:>9.2f} "
+            f"{rerank_ms:>10.2f} {similarity.mean():>7.4f} {own_recall:>7.3f} "
+            f"{mixed_recall:>7.3f} {correlation:>9.3f} {top_overlap:>6.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""Shared test helpers."""
+
+from contextlib import contextmanager
+from typing import Iterator
+from unittest.mock import MagicMock
+
+
+@contextmanager
+def fake_cursor(database_url: str) -> Iterator[MagicMock]:
+    """Stand in for ``get_cursor`` without a database."""
+    yield MagicMock()
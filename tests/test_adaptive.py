@@ -0,0 +1,24 @@
+"""Tests for adaptive rerank planning."""
+
+from nasi_ayam.retrieval.adaptive import RerankPlan, plan_rerank
+
+
+class TestPlanRerank:
+    def test_decisive_gap_skips_reranking(self) -> None:
+        plan = plan_rerank([0.9, 0.8, 0.5, 0.4], top_k=2, margin=0.1)
+        assert plan == RerankPlan(2, 2, needs_more=False)
+        assert list(plan.boundary) == []
+
+    def test_close_scores_are_reranked(self) -> None:
+        plan = plan_rerank([0.9, 0.62, 0.6, 0.58, 0.3], top_k=2, margin=0.1)
+        assert plan == RerankPlan(1, 4, needs_more=False)
+
+    def test_boundary_reaching_last_candidate_needs_more(self) -> None:
+        plan = plan_rerank([0.9, 0.6, 0.6, 0.6], top_k=2, margin=0.1)
+        assert plan.needs_more
+        assert plan.boundary_end == 4
+
+    def test_too_few_candidates_are_all_accepted(self) -> None:
+        assert plan_rerank([0.9, 0.1], top_k=3, margin=0.1) == RerankPlan(
+            2, 2, needs_more=False
+        )
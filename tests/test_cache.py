@@ -0,0 +1,34 @@
+"""Tests for the in-memory LRU cache."""
+
+from nasi_ayam.cache import LRUCache
+
+
+class TestLRUCache:
+    def test_counts_hits_and_misses(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(2)
+        cache.put("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cache.hit_rate == 0.5
+
+    def test_evicts_least_recently_used(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+        assert cache.evictions == 1
+
+    def test_zero_size_disables(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(0)
+        cache.put("a", 1)
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
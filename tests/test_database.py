@@ -0,0 +1,62 @@
+"""Tests for database helpers."""
+
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from nasi_ayam import database
+from nasi_ayam.database import (
+    DEFAULT_POOL_MAX_SIZE,
+    DEFAULT_POOL_MIN_SIZE,
+    close_pools,
+    configure_pool,
+    get_pool,
+    uuid7,
+)
+
+
+@pytest.fixture
+def mock_pool_class() -> Iterator[MagicMock]:
+    with patch("nasi_ayam.database.ConnectionPool") as pool_class:
+        pool_class.side_effect = lambda *args, **kwargs: MagicMock()
+        yield pool_class
+    close_pools()
+    configure_pool(DEFAULT_POOL_MIN_SIZE, DEFAULT_POOL_MAX_SIZE)
+
+
+class TestUuid7:
+    def test_version_and_variant(self) -> None:
+        value = uuid7()
+        assert value.version == 7
+        assert value.variant == "specified in RFC 4122"
+
+    def test_ids_are_time_ordered(self) -> None:
+        with patch("nasi_ayam.database.time.time_ns") as time_ns:
+            time_ns.side_effect = [1_000_000_000, 2_000_000_000]
+            first, second = uuid7(), uuid7()
+        assert first < second
+
+
+class TestConnectionPool:
+    def test_one_pool_per_database(self, mock_pool_class: MagicMock) -> None:
+        first = get_pool("postgresql://a")
+        assert get_pool("postgresql://a") is first
+        assert get_pool("postgresql://b") is not first
+        assert mock_pool_class.call_count == 2
+
+    def test_uses_configured_size(self, mock_pool_class: MagicMock) -> None:
+        configure_pool(2, 5)
+        get_pool("postgresql://a")
+
+        kwargs = mock_pool_class.call_args.kwargs
+        assert (kwargs["min_size"], kwargs["max_size"]) == (2, 5)
+        assert kwargs["check"] is not None
+        assert kwargs["configure"] is not None
+
+    def test_close_pools(self, mock_pool_class: MagicMock) -> None:
+        pool = get_pool("postgresql://a")
+        close_pools()
+
+        pool.close.assert_called_once()
+        assert database._pools == {}
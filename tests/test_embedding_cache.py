@@ -0,0 +1,99 @@
+"""Tests for the query embedding cache."""
+
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import psycopg
+
+from nasi_ayam.retrieval.embedding_cache import (
+    QueryEmbeddingCache,
+    normalise_query,
+    query_hash,
+)
+from tests.conftest import fake_cursor
+
+
+def _encoder() -> MagicMock:
+    return MagicMock(side_effect=lambda text: np.full(3, len(text), np.float32))
+
+
+class TestNormaliseQuery:
+    def test_ignores_case_and_whitespace(self) -> None:
+        assert normalise_query("  How do  I\tcook RICE? ") == "how do i cook rice?"
+        assert query_hash("Cook rice") == query_hash("cook   rice")
+        assert query_hash("cook rice") != query_hash("cook noodles")
+
+
+class TestQueryEmbeddingCache:
+    def test_memory_tier(self) -> None:
+        cache = QueryEmbeddingCache("model", memory_size=4)
+        encode = _encoder()
+
+        first = cache.get_or_compute("Cook rice", encode)
+        second = cache.get_or_compute("cook  RICE", encode)
+
+        encode.assert_called_once_with("Cook rice")
+        assert second is first
+        assert (cache.memory.hits, cache.misses) == (1, 1)
+
+    def test_persistent_hit_skips_encoding(self) -> None:
+        cache = QueryEmbeddingCache("model", 4, "postgresql://unused", 100)
+        encode = _encoder()
+
+        with (
+            patch("nasi_ayam.retrieval.embedding_cache.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.embedding_cache.get_query_embedding",
+                return_value=np.ones(3),
+            ) as mock_get,
+            patch(
+                "nasi_ayam.retrieval.embedding_cache.store_query_embedding"
+            ) as mock_store,
+        ):
+            embedding = cache.get_or_compute("rice", encode)
+
+        encode.assert_not_called()
+        mock_store.assert_not_called()
+        assert mock_get.call_args.args[1:] == ("model", query_hash("rice"))
+        assert embedding.tolist() == [1.0, 1.0, 1.0]
+        assert cache.persistent_hits == 1
+
+    def test_miss_is_stored_persistently(self) -> None:
+        cache = QueryEmbeddingCache("model", 4, "postgresql://unused", 100)
+
+        with (
+            patch("nasi_ayam.retrieval.embedding_cache.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.embedding_cache.get_query_embedding",
+                return_value=None,
+            ),
+            patch(
+                "nasi_ayam.retrieval.embedding_cache.store_query_embedding"
+            ) as mock_store,
+        ):
+            cache.get_or_compute("rice", _encoder())
+
+        _, model, key, embedding, max_entries = mock_store.call_args.args
+        assert (model, key, max_entries) == ("model", query_hash("rice"), 100)
+        assert embedding.tolist() == [4.0, 4.0, 4.0]
+
+    def test_database_errors_fall_back_to_encoding(self) -> None:
+        cache = QueryEmbeddingCache("model", 4, "postgresql://unused", 100)
+        encode = _encoder()
+
+        with patch(
+            "nasi_ayam.retrieval.embedding_cache.get_cursor",
+            side_effect=psycopg.OperationalError("down"),
+        ):
+            embedding = cache.get_or_compute("rice", encode)
+
+        encode.assert_called_once()
+        assert embedding.tolist() == [4.0, 4.0, 4.0]
+
+    def test_persistent_tier_disabled(self) -> None:
+        cache = QueryEmbeddingCache("model", 4, "postgresql://unused", 0)
+
+        with patch("nasi_ayam.retrieval.embedding_cache.get_cursor") as mock_cursor:
+            cache.get_or_compute("rice", _encoder())
+
+        mock_cursor.assert_not_called()
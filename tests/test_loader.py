@@ -1,17 +1,28 @@
 """Tests for the document loaders."""
 
+import asyncio
+import os
 import tempfile
 from pathlib import Path
+from typing import Any
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 
 from nasi_ayam.ingestion.chunker import DocType
+from nasi_ayam.ingestion.http_cache import HttpCache
 from nasi_ayam.ingestion.loader import (
+    LoadedDocument,
+    PdfConverter,
+    aload_github_documents,
     calculate_content_hash,
     get_doc_type,
+    github_api_request_async,
     load_local_documents,
+    materialise_documents,
     parse_github_url,
+    scan_directory,
 )
 
 
@@ -156,7 +167,7 @@ class TestLoadLocalDocuments:
             binary_file.write_bytes(b"\xff\xfe invalid utf-8")
             (Path(tmpdir) / "valid.md").write_text("valid content")
 
-            docs = list(load_local_documents(tmpdir))
+            docs = list(materialise_documents(load_local_documents(tmpdir)))
 
             assert len(docs) == 1
             assert docs[0].file_name == "valid.md"
@@ -175,3 +186,408 @@ class TestLoadLocalDocuments:
             assert docs[0].doc_type == DocType.PDF
             assert docs[0].content == "# PDF Content\n\nExtracted text"
             mock_convert.assert_called_once()
+
+    @patch("nasi_ayam.ingestion.loader.convert_pdf_to_markdown")
+    def test_defers_pdf_conversion_until_content_is_read(
+        self, mock_convert: MagicMock
+    ) -> None:
+        mock_convert.return_value = "# PDF Content"
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            pdf_file = Path(tmpdir) / "test.pdf"
+            pdf_file.write_bytes(b"%PDF-1.4 fake pdf content")
+
+            docs = list(load_local_documents(tmpdir))
+
+            assert docs[0].content_hash == calculate_content_hash(
+                b"%PDF-1.4 fake pdf content"
+            )
+            mock_convert.assert_not_called()
+
+            assert docs[0].content == "# PDF Content"
+            assert docs[0].content == "# PDF Content"
+            mock_convert.assert_called_once()
+
+    def test_defers_decoding_until_content_is_read(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            (Path(tmpdir) / "binary.txt").write_bytes(b"\xff\xfe invalid utf-8")
+
+            docs = list(load_local_documents(tmpdir))
+
+            assert len(docs) == 1
+            assert not docs[0].is_materialised
+            with pytest.raises(UnicodeDecodeError):
+                docs[0].content
+
+    def test_records_file_stats(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            md_file = Path(tmpdir) / "test.md"
+            md_file.write_text("content")
+            stat = md_file.stat()
+
+            docs = list(load_local_documents(tmpdir))
+
+            assert docs[0].mtime_ns == stat.st_mtime_ns
+            assert docs[0].inode == stat.st_ino
+
+    def test_skips_files_with_unchanged_stats(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            unchanged = Path(tmpdir) / "unchanged.md"
+            unchanged.write_text("same")
+            touched = Path(tmpdir) / "touched.md"
+            touched.write_text("same")
+            known_stats = {
+                str(path): (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                for path in (unchanged, touched)
+                for stat in [path.stat()]
+            }
+            os.utime(touched, ns=(0, touched.stat().st_mtime_ns + 1))
+
+            with patch.object(Path, "read_bytes", autospec=True) as mock_read:
+                mock_read.return_value = b"same"
+                docs = list(load_local_documents(tmpdir, known_stats))
+
+            assert [doc.file_name for doc in docs] == ["touched.md"]
+            mock_read.assert_called_once_with(touched)
+
+    def test_loads_nested_directories_in_order(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for relative in ["b.md", "a/c.md", "a/b/d.txt", "z.txt"]:
+                path = Path(tmpdir) / relative
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(relative)
+
+            docs = list(load_local_documents(tmpdir, workers=2))
+
+            assert [doc.file_path for doc in docs] == [
+                str(Path(tmpdir) / relative)
+                for relative in ["b.md", "z.txt", "a/c.md", "a/b/d.txt"]
+            ]
+            assert docs[2].content == "a/c.md"
+
+
+class TestScanDirectory:
+    @staticmethod
+    def _relative_paths(tmpdir: str, **kwargs: Any) -> list[str]:
+        return [
+            str(Path(file_path).relative_to(tmpdir))
+            for file_path, _, _ in scan_directory(tmpdir, **kwargs)
+        ]
+
+    @staticmethod
+    def _make_tree(tmpdir: str) -> None:
+        for relative in [
+            "top.md",
+            "notes/one.md",
+            "notes/two.txt",
+            "notes/drafts/three.md",
+            "node_modules/pkg/readme.md",
+        ]:
+            path = Path(tmpdir) / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(relative)
+
+    def test_limits_depth(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self._make_tree(tmpdir)
+
+            assert self._relative_paths(tmpdir, max_depth=0) == ["top.md"]
+            assert self._relative_paths(tmpdir, max_depth=1) == [
+                "top.md",
+                "notes/one.md",
+                "notes/two.txt",
+            ]
+
+    def test_include_patterns(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self._make_tree(tmpdir)
+
+            assert self._relative_paths(tmpdir, include=["*.txt"]) == ["notes/two.txt"]
+            assert self._relative_paths(tmpdir, include=["notes/*"]) == [
+                "notes/one.md",
+                "notes/two.txt",
+                "notes/drafts/three.md",
+            ]
+
+    def test_exclude_patterns_prune_directories(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self._make_tree(tmpdir)
+
+            assert self._relative_paths(
+                tmpdir, exclude=["node_modules", "notes/drafts"]
+            ) == ["top.md", "notes/one.md", "notes/two.txt"]
+
+
+EXAMPLE_PDF = Path(__file__).parent.parent / "example-data/local/beagle-profile.pdf"
+
+
+def _crashing_convert(pdf_source: str | bytes) -> str:
+    if str(pdf_source).endswith("crash.pdf"):
+        os._exit(1)
+    return f"converted {Path(str(pdf_source)).name}"
+
+
+class TestPdfConverterPool:
+    def test_yields_documents_in_source_order(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ("a.pdf", "b.pdf", "c.pdf"):
+                (Path(tmpdir) / name).write_bytes(EXAMPLE_PDF.read_bytes())
+            (Path(tmpdir) / "d.md").write_text("# Markdown")
+
+            expected = ["a.pdf", "b.pdf", "c.pdf", "d.md"]
+
+            with PdfConverter(workers=2) as converter:
+                docs = list(
+                    materialise_documents(load_local_documents(tmpdir), converter)
+                )
+
+            assert [doc.file_name for doc in docs] == expected
+            for doc in docs:
+                assert doc.content
+
+    def test_failed_pdf_does_not_stop_run(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            (Path(tmpdir) / "broken.pdf").write_bytes(b"%PDF-1.4 broken")
+            (Path(tmpdir) / "good.pdf").write_bytes(EXAMPLE_PDF.read_bytes())
+
+            with PdfConverter(workers=2) as converter:
+                docs = list(
+                    materialise_documents(load_local_documents(tmpdir), converter)
+                )
+
+            assert [doc.file_name for doc in docs] == ["good.pdf"]
+
+    @patch("nasi_ayam.ingestion.loader._convert_pdf", _crashing_convert)
+    def test_crashed_worker_is_isolated(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ("crash.pdf", "first.pdf", "second.pdf"):
+                (Path(tmpdir) / name).write_bytes(b"%PDF-1.4")
+
+            with PdfConverter(workers=2) as converter:
+                docs = list(
+                    materialise_documents(load_local_documents(tmpdir), converter)
+                )
+
+            assert sorted(doc.file_name for doc in docs) == ["first.pdf", "second.pdf"]
+            for doc in docs:
+                assert doc.content == f"converted {doc.file_name}"
+
+
+GITHUB_URL = "https://github.com/owner/repo/tree/main/docs"
+
+
+class FakeGitHub:
+    """Local stand-in for the GitHub contents and raw download endpoints."""
+
+    def __init__(
+        self,
+        files: dict[str, bytes],
+        failures: int = 0,
+        missing: list[str] | None = None,
+    ) -> None:
+        self.files = files
+        self.missing = missing or []
+        self.failures = failures
+        self.requests: list[str] = []
+        self.not_modified = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def sha(self, name: str) -> str:
+        return calculate_content_hash(self.files.get(name, b""))[:40]
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if request.url.host == "api.github.com":
+            listing = [
+                {
+                    "type": "file",
+                    "name": name,
+                    "path": f"docs/{name}",
+                    "sha": self.sha(name),
+                    "download_url": f"https://raw.example/docs/{name}",
+                }
+                for name in [*self.files, *self.missing]
+            ] + [{"type": "dir", "name": "nested", "path": "docs/nested"}]
+            etag = f'"{calculate_content_hash(repr(listing).encode())}"'
+            if request.headers.get("if-none-match") == etag:
+                self.not_modified += 1
+                return httpx.Response(304)
+            return httpx.Response(200, json=listing, headers={"ETag": etag})
+
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(500)
+
+        name = request.url.path.rsplit("/", 1)[-1]
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if name not in self.files:
+            return httpx.Response(404)
+        return httpx.Response(200, content=self.files[name])
+
+
+async def _collect(
+    fake: FakeGitHub,
+    concurrency: int = 4,
+    known_shas: dict[str, str | None] | None = None,
+    cache: HttpCache | None = None,
+) -> list[LoadedDocument]:
+    transport = httpx.MockTransport(fake.handler)
+    return [
+        doc
+        async for doc in aload_github_documents(
+            GITHUB_URL, concurrency, known_shas, cache, transport=transport
+        )
+    ]
+
+
+class TestAloadGithubDocuments:
+    @pytest.mark.asyncio
+    async def test_downloads_supported_files(self) -> None:
+        fake = FakeGitHub(
+            {"a.md": b"# A", "b.txt": b"B", "c.pdf": b"%PDF", "d.html": b"<html>"}
+        )
+
+        docs = await _collect(fake)
+
+        assert sorted(doc.file_name for doc in docs) == ["a.md", "b.txt", "c.pdf"]
+        by_name = {doc.file_name: doc for doc in docs}
+        assert by_name["a.md"].source == "github"
+        assert by_name["a.md"].file_path == "docs/a.md"
+        assert by_name["a.md"].content == "# A"
+        assert by_name["b.txt"].content_hash == calculate_content_hash(b"B")
+        assert "/docs/d.html" not in fake.requests
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrent_downloads(self) -> None:
+        fake = FakeGitHub({f"{i}.md": b"content" for i in range(12)})
+
+        docs = await _collect(fake, concurrency=3)
+
+        assert len(docs) == 12
+        assert 1 < fake.max_in_flight <= 3
+
+    @pytest.mark.asyncio
+    async def test_failed_download_is_skipped(self) -> None:
+        fake = FakeGitHub({"good.md": b"good"}, missing=["missing.md"])
+
+        with patch("nasi_ayam.ingestion.loader.asyncio.sleep"):
+            docs = await _collect(fake)
+
+        assert [doc.file_name for doc in docs] == ["good.md"]
+        assert fake.requests.count("/docs/missing.md") == 4
+
+    @pytest.mark.asyncio
+    async def test_skips_files_with_known_blob_sha(self) -> None:
+        fake = FakeGitHub({"same.md": b"same", "changed.md": b"new"})
+        known_shas: dict[str, str | None] = {
+            "docs/same.md": fake.sha("same.md"),
+            "docs/changed.md": "0" * 40,
+        }
+
+        docs = await _collect(fake, known_shas=known_shas)
+
+        assert [doc.file_name for doc in docs] == ["changed.md"]
+        assert docs[0].blob_sha == fake.sha("changed.md")
+        assert "/docs/same.md" not in fake.requests
+
+    @pytest.mark.asyncio
+    async def test_revalidates_listing_from_cache(self) -> None:
+        fake = FakeGitHub({"a.md": b"A"})
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HttpCache(tmpdir)
+            first = await _collect(fake, cache=cache)
+            second = await _collect(fake, cache=cache)
+
+        assert fake.not_modified == 1
+        assert [doc.file_name for doc in first] == ["a.md"]
+        assert [doc.file_name for doc in second] == ["a.md"]
+
+    @pytest.mark.asyncio
+    async def test_prunes_cached_files_no_longer_listed(self) -> None:
+        fake = FakeGitHub({"kept.md": b"kept"})
+        response = httpx.Response(200, content=b"old", headers={"ETag": '"v1"'})
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HttpCache(tmpdir)
+            cache.store("https://raw.example/docs/kept.md", response)
+            cache.store("https://raw.example/docs/gone.md", response)
+            await _collect(fake, cache=cache)
+
+            assert cache.load("https://raw.example/docs/kept.md") is not None
+            assert cache.load("https://raw.example/docs/gone.md") is None
+            # The listing and kept.md, each with a body and validators
+            assert len(list(Path(tmpdir).iterdir())) == 4
+
+
+class TestGithubApiRequestAsync:
+    @pytest.mark.asyncio
+    async def test_retries_failed_requests(self) -> None:
+        fake = FakeGitHub({"a.md": b"A"}, failures=2)
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(fake.handler)
+        ) as client:
+            response = await github_api_request_async(
+                client, "https://raw.example/docs/a.md", initial_delay=0
+            )
+
+        assert response.content == b"A"
+        assert len(fake.requests) == 3
+
+    @pytest.mark.asyncio
+    async def test_raises_after_max_retries(self) -> None:
+        fake = FakeGitHub({"a.md": b"A"}, failures=5)
+
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(fake.handler)
+        ) as client:
+            with pytest.raises(httpx.HTTPStatusError):
+                await github_api_request_async(
+                    client,
+                    "https://raw.example/docs/a.md",
+                    max_retries=2,
+                    initial_delay=0,
+                )
+
+        assert len(fake.requests) == 3
+
+
+class TestHttpCache:
+    def test_round_trips_response_with_validators(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HttpCache(tmpdir)
+            cache.store(
+                "https://example.com/a",
+                httpx.Response(200, content=b"body", headers={"ETag": '"v1"'}),
+            )
+
+            cached = cache.load("https://example.com/a")
+
+            assert cached is not None
+            assert cached.content == b"body"
+            assert cached.etag == '"v1"'
+            assert cache.load("https://example.com/b") is None
+
+    def test_prune_removes_other_urls(self) -> None:
+        response = httpx.Response(200, content=b"body", headers={"ETag": '"v1"'})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HttpCache(tmpdir)
+            for url in ("https://example.com/a", "https://example.com/b"):
+                cache.store(url, response)
+
+            assert cache.prune(["https://example.com/a"]) == 1
+            assert cache.load("https://example.com/a") is not None
+            assert cache.load("https://example.com/b") is None
+            assert len(list(Path(tmpdir).iterdir())) == 2
+
+    def test_ignores_responses_without_validators(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = HttpCache(tmpdir)
+            cache.store("https://example.com/a", httpx.Response(200, content=b"x"))
+
+            assert cache.load("https://example.com/a") is None
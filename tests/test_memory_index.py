@@ -0,0 +1,228 @@
+"""Tests for the in-process vector index."""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+from uuid import UUID
+
+import numpy as np
+import pytest
+
+from nasi_ayam.database import uuid7
+from nasi_ayam.retrieval.memory_index import EMBEDDINGS_FILE, MemoryVectorIndex
+from nasi_ayam.vector_store import VectorMatch
+from tests.conftest import fake_cursor
+
+
+def _chunk(document_id: UUID, source: str = "local") -> VectorMatch:
+    return VectorMatch(
+        id=uuid7(),
+        document_id=document_id,
+        source=source,
+        doc_type="md",
+        content="content",
+        start_position=0,
+        end_position=7,
+        semantic_chunk_ids=[],
+        distance=0.0,
+    )
+
+
+MODULE = "nasi_ayam.retrieval.memory_index"
+
+
+class FakeStore:
+    """Stands in for the vector chunk queries against Postgres."""
+
+    def __init__(self) -> None:
+        self.generation = 1
+        self.chunks: list[VectorMatch] = []
+        self.embeddings: dict[UUID, np.ndarray] = {}
+        self.fetched: list[UUID] = []
+
+    def add(self, chunk: VectorMatch, embedding: list[float]) -> None:
+        self.chunks.append(chunk)
+        self.embeddings[chunk.id] = np.asarray(embedding, dtype=np.float32)
+
+    def load(
+        self, cur: MagicMock, document_ids: list[UUID] | None = None
+    ) -> list[VectorMatch]:
+        return [
+            c
+            for c in self.chunks
+            if document_ids is None or c.document_id in document_ids
+        ]
+
+    def get_embeddings(
+        self, cur: MagicMock, chunk_ids: list[UUID]
+    ) -> dict[UUID, np.ndarray]:
+        self.fetched.extend(chunk_ids)
+        return {id: self.embeddings[id] for id in chunk_ids}
+
+    @contextmanager
+    def patched(self) -> Iterator[None]:
+        with (
+            patch(f"{MODULE}.get_cursor", fake_cursor),
+            patch(
+                f"{MODULE}.get_corpus_generation",
+                side_effect=lambda cur: self.generation,
+            ),
+            patch(
+                f"{MODULE}.get_document_ids",
+                side_effect=lambda cur: {c.document_id for c in self.chunks},
+            ),
+            patch(f"{MODULE}.load_vector_chunks", side_effect=self.load),
+            patch(
+                f"{MODULE}.get_vector_chunk_embeddings",
+                side_effect=self.get_embeddings,
+            ),
+        ):
+            yield
+
+
+@pytest.fixture
+def store() -> FakeStore:
+    store = FakeStore()
+    first, second = uuid7(), uuid7()
+    store.add(_chunk(first), [1.0, 0.0])
+    store.add(_chunk(first), [0.0, 1.0])
+    store.add(_chunk(second, "github"), [1.0, 1.0])
+    return store
+
+
+class TestMemoryVectorIndex:
+    def test_exact_search(self, store: FakeStore, tmp_path: Path) -> None:
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+
+        with store.patched():
+            matches = index.search([2.0, 0.1], limit=2)
+
+        assert [m.id for m in matches] == [store.chunks[0].id, store.chunks[2].id]
+        assert matches[0].distance == pytest.approx(
+            1 - 2.0 / np.hypot(2.0, 0.1), abs=1e-6
+        )
+
+    def test_filters(self, store: FakeStore, tmp_path: Path) -> None:
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+
+        with store.patched():
+            matches = index.search([1.0, 0.0], limit=5, source="github")
+
+        assert [m.id for m in matches] == [store.chunks[2].id]
+
+    def test_follows_corpus_generation(self, store: FakeStore, tmp_path: Path) -> None:
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+
+        with store.patched():
+            index.refresh()
+            removed = store.chunks.pop(2)
+            added = _chunk(uuid7())
+            store.add(added, [0.0, -1.0])
+            store.generation = 2
+            store.fetched.clear()
+
+            assert index.refresh(force=True)
+            matches = index.search([0.0, -1.0], limit=5)
+
+        assert store.fetched == [added.id]
+        assert matches[0].id == added.id
+        assert removed.id not in {m.id for m in matches}
+        assert len(index) == 3
+
+    def test_changes_append_to_the_snapshot(
+        self, store: FakeStore, tmp_path: Path
+    ) -> None:
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+        snapshot = tmp_path / EMBEDDINGS_FILE
+
+        with store.patched():
+            index.refresh()
+            before = snapshot.stat()
+            store.chunks.pop(2)
+            store.add(_chunk(uuid7()), [0.0, -1.0])
+            store.generation = 2
+            index.refresh(force=True)
+
+        after = snapshot.stat()
+        assert after.st_ino == before.st_ino
+        assert after.st_size == before.st_size + 2 * 4
+        assert len(index) == 3
+
+    def test_compacts_when_mostly_removed(
+        self, store: FakeStore, tmp_path: Path
+    ) -> None:
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+
+        with store.patched(), patch(f"{MODULE}.COMPACT_MIN_ROWS", 1):
+            index.refresh()
+            kept = store.chunks.pop(2)
+            store.chunks.clear()
+            store.chunks.append(kept)
+            store.generation = 2
+            index.refresh(force=True)
+            matches = index.search([1.0, 1.0], limit=5)
+
+            store.fetched.clear()
+            reopened = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+            reopened.refresh()
+
+        assert [m.id for m in matches] == [kept.id]
+        assert (tmp_path / EMBEDDINGS_FILE).stat().st_size == 16 + 2 * 4
+        assert store.fetched == []
+        assert len(reopened) == 1
+
+    def test_unchanged_generation_is_not_reloaded(
+        self, store: FakeStore, tmp_path: Path
+    ) -> None:
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+
+        with store.patched():
+            assert index.refresh()
+            assert not index.refresh(force=True)
+
+    def test_snapshot_is_reused(self, store: FakeStore, tmp_path: Path) -> None:
+        with store.patched():
+            MemoryVectorIndex("postgresql://unused", str(tmp_path)).refresh()
+            store.fetched.clear()
+            index = MemoryVectorIndex("postgresql://unused", str(tmp_path))
+            index.refresh()
+            matches = index.search([0.0, 1.0], limit=1)
+
+        assert store.fetched == []
+        assert matches[0].id == store.chunks[1].id
+
+    def test_unknown_mode(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="Unknown memory index mode"):
+            MemoryVectorIndex("postgresql://unused", str(tmp_path), mode="lsh")
+
+    def test_hnsw_needs_the_extra(self, tmp_path: Path) -> None:
+        with patch(f"{MODULE}.hnswlib", None):
+            with pytest.raises(ImportError, match="--extras hnsw"):
+                MemoryVectorIndex("postgresql://unused", str(tmp_path), mode="hnsw")
+
+    def test_hnsw_follows_changes(self, store: FakeStore, tmp_path: Path) -> None:
+        pytest.importorskip("hnswlib")
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path), mode="hnsw")
+
+        with store.patched():
+            index.refresh()
+            removed = store.chunks.pop(2)
+            added = _chunk(uuid7())
+            store.add(added, [1.0, 0.1])
+            store.generation = 2
+            index.refresh(force=True)
+            matches = index.search([1.0, 0.1], limit=5)
+
+        assert matches[0].id == added.id
+        assert removed.id not in {m.id for m in matches}
+        assert len(matches) == 3
+
+    def test_hnsw(self, store: FakeStore, tmp_path: Path) -> None:
+        pytest.importorskip("hnswlib")
+        index = MemoryVectorIndex("postgresql://unused", str(tmp_path), mode="hnsw")
+
+        with store.patched():
+            matches = index.search([2.0, 0.1], limit=2)
+
+        assert [m.id for m in matches] == [store.chunks[0].id, store.chunks[2].id]
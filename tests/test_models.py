@@ -0,0 +1,76 @@
+"""Tests for the model registry."""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from nasi_ayam.models import ModelRegistry, model_id, sentence_transformer_key
+
+KEY = ("embedding", "model")
+
+
+class TestModelRegistry:
+    def test_shares_loaded_model(self) -> None:
+        registry = ModelRegistry()
+        load = MagicMock(side_effect=lambda: object())
+
+        first = registry.acquire(KEY, load)
+        assert registry.acquire(KEY, load) is first
+        load.assert_called_once()
+        assert registry.references(KEY) == 2
+
+    def test_concurrent_acquires_load_once(self) -> None:
+        registry = ModelRegistry()
+        started = threading.Event()
+
+        def load() -> object:
+            started.wait(1)
+            return object()
+
+        models: list[object] = []
+        threads = [
+            threading.Thread(target=lambda: models.append(registry.acquire(KEY, load)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.set()
+        for thread in threads:
+            thread.join()
+
+        assert len({id(model) for model in models}) == 1
+        assert registry.references(KEY) == 4
+
+    def test_released_model_stays_loaded_until_unloaded(self) -> None:
+        registry = ModelRegistry()
+        load = MagicMock(side_effect=lambda: object())
+        first = registry.acquire(KEY, load)
+
+        assert not registry.unload(KEY)
+        registry.release(KEY)
+        assert registry.acquire(KEY, load) is first
+        registry.release(KEY)
+
+        assert registry.unload_unused() == [KEY]
+        assert registry.loaded() == []
+        assert registry.acquire(KEY, load) is not first
+
+    def test_release_without_acquire(self) -> None:
+        with pytest.raises(ValueError, match="not acquired"):
+            ModelRegistry().release(KEY)
+
+
+class TestModelId:
+    def test_torch_uses_model_name(self) -> None:
+        assert model_id("model", "torch") == "model"
+
+    def test_other_backends_are_distinct(self) -> None:
+        assert model_id("model", "onnx-int8") == "model:onnx-int8"
+        assert sentence_transformer_key("model", "onnx") != sentence_transformer_key(
+            "model"
+        )
+
+    def test_unknown_backend(self) -> None:
+        with pytest.raises(ValueError, match="Unknown inference backend"):
+            model_id("model", "tensorrt")
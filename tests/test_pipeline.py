@@ -0,0 +1,239 @@
+"""Tests for the staged ingestion pipeline."""
+
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from nasi_ayam.database import uuid7
+from nasi_ayam.ingestion.chunker import DocType, VectorChunk
+from nasi_ayam.ingestion.embedder import EmbeddingBatcher
+from nasi_ayam.ingestion.loader import LoadedDocument
+from nasi_ayam.ingestion.pipeline import ChunkedDocument, IngestionPipeline
+
+
+def _document(name: str, content: str) -> LoadedDocument:
+    return LoadedDocument(
+        source="local",
+        file_path=f"/docs/{name}",
+        file_name=name,
+        doc_type=DocType.MARKDOWN,
+        content_hash=name,
+        file_size=len(content),
+        raw_content=content.encode("utf-8"),
+    )
+
+
+def _fake_encode(chunks: list[VectorChunk], batch_size: int) -> list[list[float]]:
+    return [[float(len(chunk.content))] for chunk in chunks]
+
+
+def _pipeline(
+    embedder: MagicMock, embedding_batch_size: int = 4, write_batch_size: int = 1
+) -> IngestionPipeline:
+    return IngestionPipeline(
+        "postgresql://unused",
+        embedder,
+        semantic_chunk_size=8000,
+        chunk_size=20,
+        overlap_size=5,
+        queue_size=1,
+        embedding_batch_size=embedding_batch_size,
+        write_batch_size=write_batch_size,
+    )
+
+
+class TestIngestionPipeline:
+    def test_documents_flow_through_every_stage(self) -> None:
+        embedder = MagicMock()
+        embedder.encode.side_effect = _fake_encode
+        written: list[ChunkedDocument] = []
+        documents = [
+            _document(f"doc{i}.md", f"# Doc {i}\n\n" + "x" * 50) for i in range(5)
+        ]
+
+        pipeline = _pipeline(embedder)
+        with patch.object(
+            IngestionPipeline, "_write_batch", side_effect=written.extend
+        ):
+            count = pipeline.run(documents)
+
+        assert count == 5
+        assert [c.document.file_name for c in written] == [
+            d.file_name for d in documents
+        ]
+        for chunked in written:
+            assert len(chunked.embeddings) == len(chunked.vector_chunks)
+            assert chunked.semantic_chunks[0].heading_path.startswith("Doc")
+            assert chunked.vector_chunks[0].semantic_chunk_ids == [
+                chunked.semantic_chunks[0].id
+            ]
+        assert [stats.items for stats in pipeline.stats] == [5, 5, 5, 5]
+
+    def test_failed_document_is_skipped(self) -> None:
+        def encode(chunks: list[VectorChunk], batch_size: int) -> list[list[float]]:
+            if any("broken" in chunk.content for chunk in chunks):
+                raise RuntimeError("encode failed")
+            return _fake_encode(chunks, batch_size)
+
+        embedder = MagicMock()
+        embedder.encode.side_effect = encode
+        written: list[ChunkedDocument] = []
+        documents = [
+            _document("a.md", "first"),
+            _document("b.md", "broken"),
+            _document("c.md", "third"),
+        ]
+
+        pipeline = _pipeline(embedder)
+        with patch.object(
+            IngestionPipeline, "_write_batch", side_effect=written.extend
+        ):
+            count = pipeline.run(documents)
+
+        assert count == 2
+        assert [c.document.file_name for c in written] == ["a.md", "c.md"]
+        assert pipeline.stats[2].failures == 1
+
+    def test_loader_error_is_raised_after_draining(self) -> None:
+        def documents() -> Iterator[LoadedDocument]:
+            yield _document("a.md", "first")
+            raise RuntimeError("source unavailable")
+
+        embedder = MagicMock()
+        embedder.encode.side_effect = _fake_encode
+        written: list[ChunkedDocument] = []
+
+        pipeline = _pipeline(embedder)
+        with patch.object(
+            IngestionPipeline, "_write_batch", side_effect=written.extend
+        ):
+            with pytest.raises(RuntimeError, match="source unavailable"):
+                pipeline.run(documents())
+
+        assert [c.document.file_name for c in written] == ["a.md"]
+
+    def test_writes_documents_in_batches(self) -> None:
+        embedder = MagicMock()
+        embedder.encode.side_effect = _fake_encode
+        batches: list[list[str]] = []
+        documents = [_document(f"doc{i}.md", f"content {i}") for i in range(6)]
+
+        def write_batch(batch: list[ChunkedDocument]) -> None:
+            batches.append([c.document.file_name for c in batch])
+
+        pipeline = _pipeline(embedder, embedding_batch_size=100, write_batch_size=3)
+        with patch.object(IngestionPipeline, "_write_batch", side_effect=write_batch):
+            count = pipeline.run(documents)
+
+        assert count == 6
+        assert [name for batch in batches for name in batch] == [
+            d.file_name for d in documents
+        ]
+        assert all(len(batch) <= 3 for batch in batches)
+
+    def test_failed_batch_write_retries_per_document(self) -> None:
+        embedder = MagicMock()
+        embedder.encode.side_effect = _fake_encode
+        written: list[str] = []
+
+        def write_batch(batch: list[ChunkedDocument]) -> None:
+            names = [c.document.file_name for c in batch]
+            if "b.md" in names:
+                raise RuntimeError("constraint violated")
+            written.extend(names)
+
+        pipeline = _pipeline(embedder, write_batch_size=3)
+        stats = pipeline.stats[3]
+        batch = [
+            ChunkedDocument(_document(name, name), uuid7(), [], [])
+            for name in ("a.md", "b.md", "c.md")
+        ]
+        with patch.object(IngestionPipeline, "_write_batch", side_effect=write_batch):
+            pipeline._write_with_fallback(batch, stats)
+
+        assert written == ["a.md", "c.md"]
+        assert (stats.items, stats.failures) == (2, 1)
+
+    @pytest.mark.parametrize("indexed, expected", [(4, 4), (8, None), (None, None)])
+    def test_search_embeddings_follow_the_column_dimensions(
+        self, indexed: int | None, expected: int | None
+    ) -> None:
+        pipeline = IngestionPipeline(
+            "postgresql://unused",
+            MagicMock(),
+            semantic_chunk_size=8000,
+            chunk_size=20,
+            overlap_size=5,
+            queue_size=1,
+            embedding_batch_size=4,
+            write_batch_size=1,
+            search_dimensions=4,
+        )
+        chunked = ChunkedDocument(
+            _document("a.md", "content"),
+            uuid7(),
+            [],
+            [_vector_chunk("content")],
+            embeddings=[[0.1 * i for i in range(16)]],
+        )
+        records = []
+        module = "nasi_ayam.ingestion.pipeline"
+        with (
+            patch(f"{module}.get_cursor"),
+            patch(f"{module}.get_document_ids_by_path", return_value={}),
+            patch(f"{module}.delete_documents"),
+            patch(f"{module}.bump_corpus_generation"),
+            patch(f"{module}.copy_documents"),
+            patch(f"{module}.copy_semantic_chunks"),
+            patch(
+                f"{module}.copy_vector_chunks",
+                side_effect=lambda cur, rows: records.extend(rows),
+            ),
+            patch(
+                f"{module}.get_search_embedding_dimensions", return_value=indexed
+            ) as get_dimensions,
+        ):
+            pipeline._write_batch([chunked])
+            pipeline._write_batch([chunked])
+
+        get_dimensions.assert_called_once()
+        search_embeddings = [record.search_embedding for record in records]
+        if expected is None:
+            assert search_embeddings == [None, None]
+        else:
+            assert [len(e) for e in search_embeddings] == [expected, expected]
+
+
+def _vector_chunk(content: str) -> VectorChunk:
+    return VectorChunk(
+        content=content, start_position=0, end_position=0, semantic_chunk_ids=[]
+    )
+
+
+class TestEmbeddingBatcher:
+    def test_encodes_documents_together_sorted_by_length(self) -> None:
+        embedder = MagicMock()
+        embedder.encode.side_effect = _fake_encode
+        batcher = EmbeddingBatcher(embedder, batch_size=16)
+
+        documents = [
+            [_vector_chunk("aa"), _vector_chunk("aaaaa")],
+            [_vector_chunk("a")],
+            [_vector_chunk("aaaa"), _vector_chunk("aaa")],
+        ]
+        embeddings = batcher.encode(documents)
+
+        embedder.encode.assert_called_once()
+        texts = [chunk.content for chunk in embedder.encode.call_args.args[0]]
+        assert texts == ["aaaaa", "aaaa", "aaa", "aa", "a"]
+        assert embedder.encode.call_args.args[1] == 16
+        assert embeddings == [[[2.0], [5.0]], [[1.0]], [[4.0], [3.0]]]
+        assert batcher.chunks == 5
+
+    def test_handles_documents_without_chunks(self) -> None:
+        embedder = MagicMock()
+        embedder.encode.side_effect = _fake_encode
+        batcher = EmbeddingBatcher(embedder, batch_size=16)
+
+        assert batcher.encode([[], [_vector_chunk("a")]]) == [[], [[1.0]]]
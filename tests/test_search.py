@@ -0,0 +1,366 @@
+"""Tests for document search."""
+
+import logging
+from unittest.mock import MagicMock, patch
+from uuid import UUID
+
+import numpy as np
+import pytest
+
+from nasi_ayam.database import uuid7
+from nasi_ayam.retrieval.search import DocumentSearch, SemanticContext
+from nasi_ayam.vector_store import VectorMatch
+from tests.conftest import fake_cursor
+
+
+def _match(
+    content: str, semantic_chunk_ids: list[UUID], heading_paths: list[str | None]
+) -> VectorMatch:
+    return VectorMatch(
+        id=uuid7(),
+        document_id=uuid7(),
+        source="local",
+        doc_type="md",
+        content=content,
+        start_position=0,
+        end_position=len(content),
+        semantic_chunk_ids=semantic_chunk_ids,
+        distance=0.5,
+        file_name=f"{content}.md",
+        heading_paths=heading_paths,
+    )
+
+
+@pytest.fixture
+def search() -> DocumentSearch:
+    search = DocumentSearch("postgresql://unused", "reranker", 10)
+    search._model = MagicMock()
+    search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+    search._reranker = MagicMock()
+    search._reranker.predict.side_effect = lambda pairs: [
+        float(len(text)) for _, text in pairs
+    ]
+    return search
+
+
+class TestDocumentSearch:
+    def test_results_carry_context_handles(self, search: DocumentSearch) -> None:
+        shared, first, missing = uuid7(), uuid7(), uuid7()
+        matches = [
+            _match("a", [first, shared], ["Cats > Care", "Cats"]),
+            _match("bbb", [shared, missing], ["Cats", None]),
+        ]
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                return_value=matches,
+            ),
+            patch(
+                "nasi_ayam.retrieval.search.get_semantic_chunks_by_ids"
+            ) as mock_get_chunks,
+        ):
+            results = search.search("query", top_k=2)
+
+        mock_get_chunks.assert_not_called()
+        assert [r.file_name for r in results] == ["bbb.md", "a.md"]
+        assert [r.semantic_contexts for r in results] == [
+            [SemanticContext(shared, "Cats")],
+            [SemanticContext(first, "Cats > Care"), SemanticContext(shared, "Cats")],
+        ]
+
+    def test_expand_context_fetches_content(self, search: DocumentSearch) -> None:
+        context_id = uuid7()
+        row = {"id": context_id, "heading_path": "Cats", "content": "All about cats"}
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.get_semantic_chunks_by_ids",
+                return_value=[row],
+            ) as mock_get_chunks,
+        ):
+            assert search.expand_context(context_id) == row
+
+        assert mock_get_chunks.call_args.args[1] == [context_id]
+
+    def test_expand_missing_context(self, search: DocumentSearch) -> None:
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.get_semantic_chunks_by_ids",
+                return_value=[],
+            ),
+        ):
+            assert search.expand_context(uuid7()) is None
+
+    def test_reranks_only_uncached_pairs(self) -> None:
+        search = DocumentSearch(
+            "postgresql://unused", "reranker", 10, rerank_cache_size=8
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.side_effect = lambda pairs: [
+            float(len(text)) for _, text in pairs
+        ]
+        seen, fresh = _match("aa", [], []), _match("bbb", [], [])
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                side_effect=[[seen], [fresh, seen]],
+            ),
+        ):
+            search.search("Query", top_k=2)
+            results = search.search("query ", top_k=2)
+
+        second_pairs = search._reranker.predict.call_args.args[0]
+        assert second_pairs == [("query ", "bbb")]
+        assert [r.score for r in results] == [3.0, 2.0]
+
+    def test_caches_results_per_corpus_generation(self) -> None:
+        search = DocumentSearch(
+            "postgresql://unused", "reranker", 10, search_cache_size=8
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.return_value = [1.0]
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.get_corpus_generation",
+                side_effect=[1, 1, 2],
+            ),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                return_value=[_match("a", [], [])],
+            ) as mock_search,
+        ):
+            first = search.search("query", top_k=2)
+            assert search.search("Query", top_k=2) == first
+            assert mock_search.call_count == 1
+
+            search.search("query", top_k=2)
+            assert mock_search.call_count == 2
+
+        assert (search.result_cache.hits, search.result_cache.misses) == (1, 2)
+
+    def test_memory_index_replaces_vector_query(self) -> None:
+        memory_index = MagicMock()
+        memory_index.search.return_value = [_match("a", [], [])]
+        search = DocumentSearch(
+            "postgresql://unused", "reranker", 10, memory_index=memory_index
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.return_value = [1.0]
+
+        with patch("nasi_ayam.retrieval.search.get_cursor") as mock_cursor:
+            results = search.search("query", top_k=2, source="local")
+
+        mock_cursor.assert_not_called()
+        assert memory_index.search.call_args.args[1:] == (10, "local", None)
+        assert [r.file_name for r in results] == ["a.md"]
+
+    def test_adaptive_rerank_skips_decisive_candidates(self) -> None:
+        search = DocumentSearch(
+            "postgresql://unused", "reranker", 4, adaptive_rerank_margin=0.1
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.side_effect = lambda pairs: [
+            float(len(text)) for _, text in pairs
+        ]
+        matches = [
+            _match(content, [], []) for content in ("a", "bb", "ccc", "dddd", "e")
+        ]
+        for match, distance in zip(matches, (0.1, 0.4, 0.42, 0.44, 0.9)):
+            match.distance = distance
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                return_value=matches,
+            ),
+        ):
+            results = search.search("query", top_k=2)
+
+        pairs = search._reranker.predict.call_args.args[0]
+        assert [text for _, text in pairs] == ["bb", "ccc", "dddd"]
+        assert [r.content for r in results] == ["a", "dddd"]
+        assert [r.reranked for r in results] == [False, True]
+        assert results[0].score == pytest.approx(0.9)
+
+    def test_adaptive_rerank_logs_measured_savings(
+        self, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        search = DocumentSearch(
+            "postgresql://unused",
+            "reranker",
+            4,
+            rerank_cache_size=8,
+            adaptive_rerank_margin=0.1,
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.side_effect = lambda pairs: [0.0 for _ in pairs]
+        decisive = [_match(content, [], []) for content in ("a", "b", "c")]
+        for match, distance in zip(decisive, (0.1, 0.2, 0.9)):
+            match.distance = distance
+        ambiguous = [_match(content, [], []) for content in ("d", "e", "f", "g")]
+        for match, distance in zip(ambiguous, (0.1, 0.4, 0.42, 0.9)):
+            match.distance = distance
+
+        with (
+            caplog.at_level(logging.INFO, logger="nasi_ayam.search"),
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                side_effect=[decisive, ambiguous, ambiguous],
+            ),
+            patch(
+                "nasi_ayam.retrieval.search.time.perf_counter",
+                side_effect=[1.0, 1.006],
+            ),
+        ):
+            search.search("query", top_k=2)
+            unmeasured = caplog.messages[-1]
+            search.search("query", top_k=2)
+            measured = caplog.messages[-1]
+            # Served from the score cache, so the cost per pair is unchanged
+            search.search("query", top_k=2)
+            cached = caplog.messages[-1]
+
+        assert unmeasured == (
+            "Adaptive rerank: 2 accepted by vector score, 0 ambiguous, "
+            "3/3 candidates skipped the reranker"
+        )
+        assert measured == (
+            "Adaptive rerank: 1 accepted by vector score, 2 ambiguous, "
+            "2/4 candidates skipped the reranker, an estimated 6.0ms saved "
+            "at 3.00ms per pair over 2 measured pairs"
+        )
+        assert cached == measured
+
+    def test_adaptive_rerank_fetches_more_when_ambiguous(self) -> None:
+        search = DocumentSearch(
+            "postgresql://unused", "reranker", 4, adaptive_rerank_margin=0.1
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.side_effect = lambda pairs: [0.0 for _ in pairs]
+
+        def fetch(cur, embedding, limit, *args, **kwargs):
+            matches = [_match(str(i), [], []) for i in range(limit)]
+            for i, match in enumerate(matches):
+                match.distance = 0.1 if i == 0 else 0.5 if limit < 16 else 0.9
+            return matches
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks", side_effect=fetch
+            ) as mock_search,
+        ):
+            search.search("query", top_k=2)
+
+        assert [c.args[2] for c in mock_search.call_args_list] == [4, 8, 16]
+
+    def test_cascade_prunes_with_first_pass_reranker(self) -> None:
+        search = DocumentSearch(
+            "postgresql://unused",
+            "reranker",
+            10,
+            cascade_candidate_count=2,
+            first_pass_reranker_model="tiny",
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._first_pass_reranker = MagicMock()
+        search._first_pass_reranker.predict.side_effect = lambda pairs: [
+            float(len(text)) for _, text in pairs
+        ]
+        search._reranker = MagicMock()
+        search._reranker.predict.side_effect = lambda pairs: [
+            -float(len(text)) for _, text in pairs
+        ]
+        matches = [_match(content, [], []) for content in ("a", "bbb", "cc")]
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                return_value=matches,
+            ),
+        ):
+            results = search.search("query", top_k=1)
+
+        pairs = search._reranker.predict.call_args.args[0]
+        assert [text for _, text in pairs] == ["bbb", "cc"]
+        assert [r.content for r in results] == ["cc"]
+
+    def test_cascade_prunes_by_vector_order(self) -> None:
+        search = DocumentSearch(
+            "postgresql://unused", "reranker", 10, cascade_candidate_count=2
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.side_effect = lambda pairs: [0.0 for _ in pairs]
+        matches = [_match(content, [], []) for content in ("a", "bbb", "cc")]
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                return_value=matches,
+            ),
+        ):
+            search.search("query", top_k=1)
+
+        pairs = search._reranker.predict.call_args.args[0]
+        assert [text for _, text in pairs] == ["a", "bbb"]
+
+    @pytest.mark.parametrize(
+        "indexed, expected", [(None, None), (128, None), (256, 256)]
+    )
+    def test_truncated_search_needs_rebuilt_embeddings(
+        self, indexed: int | None, expected: int | None
+    ) -> None:
+        search = DocumentSearch(
+            "postgresql://unused", "reranker", 10, search_dimensions=256
+        )
+        search._model = MagicMock()
+        search._model.encode.return_value = np.zeros(4, dtype=np.float32)
+        search._reranker = MagicMock()
+        search._reranker.predict.return_value = [1.0]
+
+        with (
+            patch("nasi_ayam.retrieval.search.get_cursor", fake_cursor),
+            patch(
+                "nasi_ayam.retrieval.search.get_search_embedding_dimensions",
+                return_value=indexed,
+            ) as mock_dimensions,
+            patch(
+                "nasi_ayam.retrieval.search.search_vector_chunks",
+                return_value=[_match("a", [], [])],
+            ) as mock_search,
+        ):
+            search.search("query", top_k=2)
+            search.search("other query", top_k=2)
+
+        assert mock_dimensions.call_count == 1
+        assert [c.kwargs["search_dimensions"] for c in mock_search.call_args_list] == [
+            expected,
+            expected,
+        ]
@@ -0,0 +1,292 @@
+"""Tests for the pgvector store."""
+
+from typing import Any
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from nasi_ayam.database import uuid7
+from nasi_ayam.vector_store import (
+    VectorChunkRecord,
+    VectorMatch,
+    copy_vector_chunks,
+    default_ivfflat_lists,
+    load_vector_chunks,
+    rebuild_vector_index,
+    search_vector_chunks,
+    truncate_embedding,
+)
+
+
+def _row(distance: float) -> dict[str, Any]:
+    return {
+        "id": uuid7(),
+        "document_id": uuid7(),
+        "source": "local",
+        "doc_type": "md",
+        "content": "content",
+        "start_position": 0,
+        "end_position": 7,
+        "semantic_chunk_ids": [uuid7()],
+        "distance": distance,
+    }
+
+
+def _statement(cur: MagicMock) -> str:
+    return str(cur.execute.call_args.args[0].as_string(None))
+
+
+def _settings(cur: MagicMock) -> dict[str, str]:
+    return {
+        call.args[1][0]: call.args[1][1]
+        for call in cur.execute.call_args_list
+        if call.args[0] == "SELECT set_config(%s, %s, true)"
+    }
+
+
+class TestSearchVectorChunks:
+    def test_returns_typed_matches(self) -> None:
+        cur = MagicMock()
+        rows = [_row(0.1), _row(0.2)]
+        cur.fetchall.return_value = rows
+
+        matches = search_vector_chunks(cur, [0.5, 0.5], limit=2)
+
+        assert matches == [VectorMatch(**row) for row in rows]
+        params = cur.execute.call_args.args[1]
+        assert params["limit"] == 2
+        assert params["embedding"].dtype == np.float32
+        assert "WHERE" not in _statement(cur)
+
+    def test_filters_on_typed_columns(self) -> None:
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+
+        search_vector_chunks(cur, [0.5], limit=5, source="github", doc_type="pdf")
+
+        statement = _statement(cur)
+        assert "source = %(source)s::document_source" in statement
+        assert "doc_type = %(doc_type)s::document_doc_type" in statement
+        params = cur.execute.call_args.args[1]
+        assert (params["source"], params["doc_type"]) == ("github", "pdf")
+
+    @pytest.mark.parametrize(
+        "filters", [{"source": "gitlab"}, {"doc_type": "docx"}, {"doc_type": "MD"}]
+    )
+    def test_unknown_filter_matches_nothing(self, filters: dict[str, str]) -> None:
+        cur = MagicMock()
+
+        assert search_vector_chunks(cur, [0.5], limit=5, **filters) == []
+        cur.execute.assert_not_called()
+
+    def test_sets_index_search_parameters(self) -> None:
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+
+        search_vector_chunks(cur, [0.5], limit=50, ef_search=40, probes=7)
+
+        assert _settings(cur) == {"hnsw.ef_search": "50", "ivfflat.probes": "7"}
+
+    def test_truncated_first_stage_is_rescored(self) -> None:
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+
+        search_vector_chunks(
+            cur, [0.5] * 8, limit=5, ef_search=10, search_dimensions=4, rescore_factor=3
+        )
+
+        statement = _statement(cur)
+        assert "ORDER BY search_embedding <=> %(search_embedding)s" in statement
+        assert "v.embedding <=> %(embedding)s AS distance" in statement
+        params = cur.execute.call_args.args[1]
+        assert (params["candidates"], params["limit"]) == (15, 5)
+        assert len(params["search_embedding"]) == 4
+        assert _settings(cur)["hnsw.ef_search"] == "15"
+
+    def test_ef_search_is_capped_for_many_candidates(self) -> None:
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+
+        search_vector_chunks(
+            cur,
+            [0.5] * 8,
+            limit=200,
+            ef_search=40,
+            search_dimensions=4,
+            rescore_factor=10,
+        )
+
+        assert cur.execute.call_args.args[1]["candidates"] == 2000
+        settings = _settings(cur)
+        assert settings["hnsw.ef_search"] == "1000"
+        assert settings["hnsw.iterative_scan"] == "relaxed_order"
+
+    def test_binary_prefilter_is_rescored(self) -> None:
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+
+        search_vector_chunks(cur, [0.5] * 8, limit=5, quantization="bit")
+
+        statement = _statement(cur)
+        assert (
+            "ORDER BY (binary_quantize(embedding)::bit(8)) <~> "
+            "(binary_quantize(%(search_embedding)s)::bit(8))"
+        ) in statement
+        assert "v.embedding <=> %(embedding)s AS distance" in statement
+        assert cur.execute.call_args.args[1]["candidates"] == 20
+
+    def test_unknown_quantization(self) -> None:
+        with pytest.raises(ValueError, match="Unknown vector quantization"):
+            search_vector_chunks(MagicMock(), [0.5], limit=5, quantization="pq")
+
+    def test_filtered_search_scans_iteratively(self) -> None:
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+
+        search_vector_chunks(cur, [0.5], limit=5, source="local")
+
+        assert _settings(cur)["hnsw.iterative_scan"] == "relaxed_order"
+
+
+class TestLoadVectorChunks:
+    def test_loads_documents(self) -> None:
+        cur = MagicMock()
+        row = _row(0.0)
+        cur.fetchall.return_value = [row]
+        document_ids = [row["document_id"]]
+
+        assert load_vector_chunks(cur, document_ids) == [VectorMatch(**row)]
+
+        assert "m.document_id = ANY(%(document_ids)s)" in _statement(cur)
+        assert cur.execute.call_args.args[1] == {"document_ids": document_ids}
+
+    def test_loads_everything(self) -> None:
+        cur = MagicMock()
+        cur.fetchall.return_value = []
+
+        load_vector_chunks(cur)
+
+        assert "WHERE" not in _statement(cur)
+
+
+class TestRebuildVectorIndex:
+    def _statements(self, cur: MagicMock) -> list[str]:
+        return [
+            call.args[0].as_string(None)
+            for call in cur.execute.call_args_list
+            if not isinstance(call.args[0], str)
+        ]
+
+    def test_hnsw(self) -> None:
+        cur = MagicMock()
+
+        rebuild_vector_index(cur, "hnsw", hnsw_m=24, hnsw_ef_construction=100)
+
+        drop, create = self._statements(cur)
+        assert drop == 'DROP INDEX IF EXISTS "idx_vector_chunks_embedding"'
+        assert "USING hnsw (embedding vector_cosine_ops)" in create
+        assert "WITH (m = 24, ef_construction = 100)" in create
+        assert (
+            "ALTER TABLE vector_chunks "
+            "ALTER COLUMN search_embedding TYPE vector USING NULL"
+        ) in [call.args[0] for call in cur.execute.call_args_list]
+
+    def test_ivfflat_sizes_lists_from_rows(self) -> None:
+        cur = MagicMock()
+        cur.fetchone.return_value = {"count": 250_000}
+
+        rebuild_vector_index(cur, "ivfflat", hnsw_m=16, hnsw_ef_construction=64)
+
+        create = self._statements(cur)[-1]
+        assert "USING ivfflat (embedding vector_cosine_ops)" in create
+        assert "WITH (lists = 250)" in create
+
+    def test_truncated_embeddings_are_backfilled_and_indexed(self) -> None:
+        cur = MagicMock()
+
+        rebuild_vector_index(cur, "hnsw", 16, 64, search_dimensions=256)
+
+        _, alter, backfill, create = self._statements(cur)
+        assert "TYPE vector(256)" in alter
+        assert "subvector(embedding, 1, 256)" in backfill
+        assert "USING hnsw (search_embedding vector_cosine_ops)" in create
+
+    def test_halfvec_index_over_truncated_embeddings(self) -> None:
+        cur = MagicMock()
+
+        rebuild_vector_index(
+            cur, "hnsw", 16, 64, search_dimensions=256, quantization="halfvec"
+        )
+
+        create = self._statements(cur)[-1]
+        assert (
+            "USING hnsw ((search_embedding::halfvec(256)) halfvec_cosine_ops)"
+        ) in create
+
+    def test_binary_index_reads_embedding_dimensions(self) -> None:
+        cur = MagicMock()
+        cur.fetchone.return_value = {"dimensions": 768}
+
+        rebuild_vector_index(
+            cur, "ivfflat", 16, 64, ivfflat_lists=100, quantization="bit"
+        )
+
+        create = self._statements(cur)[-1]
+        assert (
+            "USING ivfflat ((binary_quantize(embedding)::bit(768)) bit_hamming_ops)"
+        ) in create
+
+    def test_unknown_index_type(self) -> None:
+        with pytest.raises(ValueError, match="Unknown vector index type"):
+            rebuild_vector_index(MagicMock(), "flat", 16, 64)
+
+    def test_default_ivfflat_lists(self) -> None:
+        assert default_ivfflat_lists(0) == 1
+        assert default_ivfflat_lists(50_000) == 50
+        assert default_ivfflat_lists(4_000_000) == 2000
+
+
+class TestCopyVectorChunks:
+    def test_writes_binary_rows(self) -> None:
+        cur = MagicMock()
+        copy = cur.copy.return_value.__enter__.return_value
+        record = VectorChunkRecord(
+            id=uuid7(),
+            document_id=uuid7(),
+            source="local",
+            doc_type="txt",
+            content="hello",
+            start_position=0,
+            end_position=5,
+            semantic_chunk_ids=[],
+            embedding=[1.0, 2.0],
+        )
+
+        assert copy_vector_chunks(cur, [record, record]) == 2
+
+        assert "FORMAT BINARY" in cur.copy.call_args.args[0].as_string(None)
+        assert copy.write_row.call_count == 2
+        row = copy.write_row.call_args.args[0]
+        assert row[:8] == (
+            record.id,
+            record.document_id,
+            "local",
+            "txt",
+            "hello",
+            0,
+            5,
+            [],
+        )
+        assert row[8].tolist() == [1.0, 2.0]
+
+
+class TestTruncateEmbedding:
+    def test_layer_norms_truncates_and_normalises(self) -> None:
+        truncated = truncate_embedding([4.0, 0.0, 2.0, 2.0], 2)
+
+        assert truncated.tolist() == pytest.approx([np.sqrt(0.5), -np.sqrt(0.5)])
+
+    def test_invalid_dimensions(self) -> None:
+        with pytest.raises(ValueError):
+            truncate_embedding([1.0], 0)